@@ -152,9 +152,10 @@ fi
 source .venv/bin/activate
 
 # Install Python dependencies for indexing scripts
+# (scripts/embeddings.py relies on the ONNX embedding function of chromadb 1.x)
 pip install --upgrade pip
 pip install \
-    chromadb \
+    "chromadb>=1.0,<2" \
     requests \
     gitpython \
     python-gitlab
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmark Chroma query latency and recall for HNSW settings
+Run: source .venv/bin/activate && python scripts/benchmark-query.py --sizes 1000,10000,50000
+     python scripts/benchmark-query.py --snapshot ~/index-snapshot.zip --collection codebase_knowledge --M 16,32 --search-ef 10,50,100
+
+Builds throwaway collections of increasing size (from synthetic vectors or the
+embeddings in an index snapshot) and reports, per setting:
+build time, memory, query latency p50/p99 and recall@k against exact
+brute-force search. Use the results to pick `hnsw` values in collections.json.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.indexing_pipeline import import_chromadb
+from scripts.collection_config import HNSW_DEFAULTS, HNSW_SPACES, validate_hnsw, hnsw_metadata, apply_search_ef
+
+WARMUP_QUERIES = 5
+SYNTHETIC_CLUSTERS = 50
+
+
+def parse_ints(value):
+    """Parse a comma-separated list of positive integers"""
+    try:
+        values = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got '{value}'")
+    if not values or any(v < 1 for v in values):
+        raise argparse.ArgumentTypeError(f"expected positive integers, got '{value}'")
+    return values
+
+
+def rss_mb():
+    """Current resident memory of this process (Chroma's index lives in-process)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        # Peak rather than current memory, but still comparable between runs
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dir_size_mb(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file()) / 1024 / 1024
+
+
+def synthetic_vectors(count, dimensions, seed):
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(SYNTHETIC_CLUSTERS, dimensions))
+    vectors = centers[rng.integers(0, SYNTHETIC_CLUSTERS, count)] + rng.normal(scale=0.6, size=(count, dimensions))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('<f4')
+
+
+def snapshot_vectors(path, collection):
+    """Load a collection's embeddings from an index snapshot"""
+    import io
+    import numpy as np
+
+    with zipfile.ZipFile(Path(path).expanduser()) as zf:
+        manifest = json.loads(zf.read('manifest.json'))
+        entries = {entry['name']: entry for entry in manifest['collections']}
+        if collection not in entries:
+            raise RuntimeError(f"Snapshot has no collection '{collection}' (available: {', '.join(entries)})")
+        entry = entries[collection]
+        if 'embeddings' not in entry['files']:
+            raise RuntimeError(f"Collection '{collection}' in the snapshot is empty")
+        return np.load(io.BytesIO(zf.read(entry['files']['embeddings'])))
+
+
+def exact_neighbors(data, queries, k, space):
+    """Brute-force top-k indices in the same distance space Chroma uses"""
+    import numpy as np
+
+    scores = queries @ data.T
+    if space == 'l2':
+        # ||q - x||² ranks like ||x||² - 2 q·x
+        scores = (data * data).sum(axis=1) - 2 * scores
+    elif space == 'cosine':
+        scores = -scores / (np.linalg.norm(data, axis=1) * np.linalg.norm(queries, axis=1, keepdims=True))
+    else:
+        scores = -scores
+
+    k = min(k, data.shape[0])
+    top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in top.tolist()]
+
+
+def build_collection(client, path, data, hnsw, batch_size):
+    """Create a collection with the given HNSW settings and load vectors into it
+
+    Returns:
+        tuple: (collection, build seconds, memory increase in MB, disk increase in MB)
+    """
+    rss_before = rss_mb()
+    disk_before = dir_size_mb(path)
+    started = time.perf_counter()
+
+    collection = client.create_collection(
+        name=f"benchmark_{int(time.time() * 1000)}",
+        metadata=hnsw_metadata(hnsw),
+        embedding_function=None
+    )
+    for offset in range(0, len(data), batch_size):
+        batch = data[offset:offset + batch_size]
+        collection.add(
+            ids=[str(i) for i in range(offset, offset + len(batch))],
+            embeddings=batch
+        )
+
+    build_seconds = time.perf_counter() - started
+    return collection, build_seconds, rss_mb() - rss_before, dir_size_mb(path) - disk_before
+
+
+def measure_queries(collection, queries, k, expected):
+    """Time single-vector queries and compute recall@k
+
+    Returns:
+        tuple: (p50 ms, p99 ms, recall@k)
+    """
+    import numpy as np
+
+    for query in queries[:WARMUP_QUERIES]:
+        collection.query(query_embeddings=[query], n_results=k, include=[])
+
+    latencies = []
+    hits = 0
+    for query, exact in zip(queries, expected):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(exact & {int(doc_id) for doc_id in result['ids'][0]})
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return p50, p99, hits / sum(len(exact) for exact in expected)
+
+
+def run_benchmark(args):
+    import numpy as np
+
+    if args.snapshot:
+        vectors = snapshot_vectors(args.snapshot, args.collection)
+        # Held-out rows are the queries, so they are never their own neighbour
+        if len(vectors) <= args.queries:
+            raise RuntimeError(f"Collection has {len(vectors)} vectors, need more than --queries {args.queries}")
+        data, queries = vectors[:-args.queries], vectors[-args.queries:]
+        sizes = sorted({min(size, len(data)) for size in args.sizes})
+        print(f"📦 Data: {args.collection} from {args.snapshot} ({len(data)} vectors, {data.shape[1]} dimensions)")
+    else:
+        sizes = sorted(set(args.sizes))
+        vectors = synthetic_vectors(sizes[-1] + args.queries, args.dimensions, args.seed)
+        data, queries = vectors[:sizes[-1]], vectors[sizes[-1]:]
+        print(f"📦 Data: synthetic ({sizes[-1]} vectors, {args.dimensions} dimensions)")
+
+    print(f"🔎 {len(queries)} queries, recall@{args.k} vs brute force, space {args.space}")
+    print()
+
+    chromadb = import_chromadb()
+    tmp_dir = tempfile.mkdtemp(prefix='chroma-benchmark-')
+    results = []
+
+    header = f"{'size':>8} {'M':>4} {'c_ef':>5} {'s_ef':>5} {'build s':>8} {'mem MB':>7} {'disk MB':>8} {'p50 ms':>7} {'p99 ms':>7} {'recall':>7}"
+    print(header)
+    print('-' * len(header))
+
+    try:
+        client = chromadb.PersistentClient(path=tmp_dir)
+        batch_size = min(args.batch_size, client.get_max_batch_size())
+
+        for size in sizes:
+            subset = np.ascontiguousarray(data[:size])
+            expected = exact_neighbors(subset, queries, args.k, args.space)
+
+            for m in args.M:
+                for construction_ef in args.construction_ef:
+                    hnsw = validate_hnsw({
+                        'space': args.space,
+                        'M': m,
+                        'construction_ef': construction_ef,
+                        'search_ef': args.search_ef[0],
+                    })
+                    collection, build_seconds, memory, disk = build_collection(client, tmp_dir, subset, hnsw, batch_size)
+
+                    for search_ef in args.search_ef:
+                        if apply_search_ef(collection, search_ef):
+                            # A loaded index keeps its search_ef, so reload it from disk
+                            client.clear_system_cache()
+                            client = chromadb.PersistentClient(path=tmp_dir)
+                            collection = client.get_collection(name=collection.name)
+                        p50, p99, recall = measure_queries(collection, queries, args.k, expected)
+                        row = {
+                            'size': size,
+                            'space': args.space,
+                            'M': m,
+                            'construction_ef': construction_ef,
+                            'search_ef': search_ef,
+                            'build_seconds': round(build_seconds, 3),
+                            'memory_mb': round(memory, 1),
+                            'disk_mb': round(disk, 1),
+                            'p50_ms': round(p50, 3),
+                            'p99_ms': round(p99, 3),
+                            f'recall_at_{args.k}': round(recall, 4),
+                        }
+                        results.append(row)
+                        print(
+                            f"{size:>8} {m:>4} {construction_ef:>5} {search_ef:>5} {build_seconds:>8.2f} "
+                            f"{memory:>7.1f} {disk:>8.1f} {p50:>7.2f} {p99:>7.2f} {recall:>7.3f}",
+                            flush=True
+                        )
+
+                    client.delete_collection(name=collection.name)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Chroma query latency and recall for HNSW settings')
+    parser.add_argument(
+        '--sizes',
+        type=parse_ints,
+        default=[1000, 10000, 50000],
+        help='Comma-separated collection sizes to build (default: 1000,10000,50000)'
+    )
+    parser.add_argument('--snapshot', help='Use embeddings from an index snapshot instead of synthetic vectors')
+    parser.add_argument(
+        '--collection',
+        default='codebase_knowledge',
+        help='Snapshot collection to take embeddings from (default: codebase_knowledge)'
+    )
+    parser.add_argument('--dimensions', type=int, default=384, help='Synthetic vector dimensions (default: 384)')
+    parser.add_argument('--queries', type=int, default=200, help='Number of timed queries (default: 200)')
+    parser.add_argument('-k', type=int, default=10, help='Results per query for recall@k (default: 10)')
+    parser.add_argument('--space', choices=HNSW_SPACES, default=HNSW_DEFAULTS['space'], help='Distance space')
+    parser.add_argument('--M', type=parse_ints, default=[HNSW_DEFAULTS['M']], help='HNSW M values to compare')
+    parser.add_argument(
+        '--construction-ef',
+        type=parse_ints,
+        default=[HNSW_DEFAULTS['construction_ef']],
+        help='HNSW construction_ef values to compare'
+    )
+    parser.add_argument(
+        '--search-ef',
+        type=parse_ints,
+        default=[HNSW_DEFAULTS['search_ef']],
+        help='HNSW search_ef values to compare (no rebuild needed per value)'
+    )
+    parser.add_argument('--batch-size', type=int, default=5000, help='Vectors per add() call while building')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for synthetic data')
+    parser.add_argument('--output', help='Also write results as JSON to this file')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  Chroma Query Benchmark")
+    print("=" * 60)
+
+    try:
+        results = run_benchmark(args)
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+    if args.output:
+        with open(Path(args.output).expanduser(), 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    print()
+    print("=" * 60)
+    print(f"✅ {len(results)} configurations measured")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Collection routing for partitioned Chroma indexes
+Shards documents into per-type or per-repo collections and fans queries out to them
+"""
+
+import os
+import re
+import hashlib
+from typing import Optional, Dict, Any, List
+
+from scripts.collection_config import collection_settings, hnsw_metadata, hnsw_mismatches, apply_search_ef
+from scripts.embeddings import (
+    DEFAULT_EMBEDDING,
+    ModelMismatchError,
+    embedding_model,
+    model_identity,
+    collection_identity,
+    describe_identity,
+    settings_for_identity,
+    chroma_embedding_function,
+    stored_embedding_function,
+)
+
+# Partition modes: metadata key used to pick a shard (None = single collection)
+PARTITION_KEYS = {
+    'none': None,
+    'type': 'type',
+    'repo': 'repo',
+}
+
+DEFAULT_PARTITION = os.getenv('CHROMA_PARTITION', 'none').strip().lower() or 'none'
+
+# Logical collections sharded by CHROMA_PARTITION (Slack messages are never partitioned)
+PARTITIONED_COLLECTIONS = ('codebase_knowledge',)
+
+# Chroma collection names: 3-63 chars, alphanumeric start/end, [a-zA-Z0-9._-] inside
+MAX_COLLECTION_NAME = 63
+SHARD_SEPARATOR = '__'
+
+
+class StaleLayoutError(RuntimeError):
+    """Collections from another partition mode exist next to the configured one"""
+
+
+def _collection_name(collection) -> str:
+    """Return collection name (list_collections returns names or objects depending on version)"""
+    return collection if isinstance(collection, str) else collection.name
+
+
+def list_collection_names(client) -> List[str]:
+    """Names of all collections in a Chroma database"""
+    return sorted(_collection_name(c) for c in client.list_collections())
+
+
+def partition_for(collection_name: str) -> str:
+    """Partition mode a logical collection uses under the current CHROMA_PARTITION"""
+    return DEFAULT_PARTITION if collection_name in PARTITIONED_COLLECTIONS else 'none'
+
+
+def fit_collection_name(name: str, key: str) -> str:
+    """Shorten a collection name to Chroma's limit, keeping it unique with a hash of `key`"""
+    if len(name) <= MAX_COLLECTION_NAME:
+        return name
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+    return f"{name[:MAX_COLLECTION_NAME - 9].rstrip('_-')}_{digest}"
+
+
+_OPERATORS = {
+    '$eq': lambda value, target: value == target,
+    '$ne': lambda value, target: value != target,
+    '$gt': lambda value, target: value is not None and value > target,
+    '$gte': lambda value, target: value is not None and value >= target,
+    '$lt': lambda value, target: value is not None and value < target,
+    '$lte': lambda value, target: value is not None and value <= target,
+    '$in': lambda value, target: value in target,
+    '$nin': lambda value, target: value not in target,
+}
+
+
+def metadata_matches(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma metadata filter against a metadata dict
+
+    Used for documents that are not stored in Chroma (dedup references).
+
+    Raises:
+        ValueError: Unsupported operator
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            for operator, target in condition.items():
+                if operator not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator '{operator}'")
+                try:
+                    if not _OPERATORS[operator](metadata.get(key), target):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class CollectionRouter:
+    """Routes documents to shard collections and merges shard query results
+
+    With partition 'none' the router is a thin wrapper around one collection
+    named `base_name`, so unpartitioned setups keep their existing layout.
+    Otherwise every distinct value of the partition key (`type` or `repo`)
+    gets its own collection named `<base_name>__<value>`.
+
+    All shards share the same embedding model and distance space, so
+    distances from different shards are comparable and can be merged.
+    HNSW and embedding settings come from the collection settings file
+    unless given explicitly. Writes are refused for shards embedded with a
+    different model; queries are embedded with each shard's own model.
+    """
+
+    def __init__(
+        self,
+        client,
+        base_name: str,
+        partition: str = DEFAULT_PARTITION,
+        metadata: Optional[Dict[str, Any]] = None,
+        hnsw: Optional[Dict[str, Any]] = None,
+        embedding: Optional[Dict[str, Any]] = None
+    ):
+        if partition not in PARTITION_KEYS:
+            raise ValueError(
+                f"Unknown partition mode '{partition}' (expected one of: {', '.join(PARTITION_KEYS)})"
+            )
+
+        self.client = client
+        self.base_name = base_name
+        self.partition = partition
+        self.partition_key = PARTITION_KEYS[partition]
+        self.metadata = metadata or {}
+        self.hnsw = collection_settings(base_name).get('hnsw', {}) if hnsw is None else hnsw
+        self.embedding = embedding or collection_settings(base_name).get('embedding') or DEFAULT_EMBEDDING
+        self._collections = {}
+
+    # Shard naming
+
+    def shard_name(self, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Get shard collection name for a document's metadata"""
+        if not self.partition_key:
+            return self.base_name
+
+        value = (metadata or {}).get(self.partition_key)
+        if value is None or value == '':
+            raise ValueError(f"Document metadata has no '{self.partition_key}' to route on")
+
+        return self._shard_name_for_value(str(value))
+
+    def _shard_name_for_value(self, value: str) -> str:
+        """Build a valid Chroma collection name for a partition value"""
+        slug = re.sub(r'[^a-zA-Z0-9_-]+', '_', value).strip('_-') or 'default'
+        # Keep names unique when truncating long repo paths
+        return fit_collection_name(f"{self.base_name}{SHARD_SEPARATOR}{slug}", value)
+
+    # Collection access
+
+    def _get_collection(self, name: str, partition_value: Optional[str] = None, create: bool = True):
+        """Get or create shard collection (cached per router)"""
+        if name in self._collections:
+            return self._collections[name]
+
+        # Vectors always come from the shared EmbeddingModel; Chroma's default
+        # embedding function would load a fresh ONNX model on every call
+        if not create or name in list_collection_names(self.client):
+            collection = self.client.get_collection(name=name, embedding_function=None)
+            self._store_embedding_function(collection)
+        else:
+            metadata = dict(self.metadata)
+            metadata.update(hnsw_metadata(self.hnsw))
+            metadata.update(model_identity(self.embedding))
+            if self.partition_key:
+                metadata['partition'] = self.partition
+                metadata['partition_value'] = partition_value or ''
+            collection = self.client.get_or_create_collection(
+                name=name,
+                metadata=metadata or None,
+                embedding_function=chroma_embedding_function(self.embedding)
+            )
+
+        self._apply_hnsw(collection)
+        self._collections[name] = collection
+        return collection
+
+    def _apply_hnsw(self, collection):
+        """Apply configured search_ef and warn about settings fixed at creation"""
+        if not self.hnsw:
+            return
+
+        mismatches = hnsw_mismatches(collection, self.hnsw)
+        if mismatches:
+            print(
+                f"\n⚠️  {collection.name} was built with HNSW {', '.join(mismatches)}; "
+                f"run scripts/migrate-collection.py {self.base_name} to rebuild"
+            )
+        if 'search_ef' in self.hnsw:
+            apply_search_ef(collection, self.hnsw['search_ef'])
+
+    def collection_for(self, metadata: Optional[Dict[str, Any]] = None):
+        """Get the shard collection a document with this metadata belongs to"""
+        name = self.shard_name(metadata)
+        value = str(metadata[self.partition_key]) if self.partition_key else None
+        collection = self._get_collection(name, value)
+        self._check_model(collection)
+        return collection
+
+    # Embedding model
+
+    @property
+    def embedding_model(self):
+        """Model new documents are embedded with"""
+        return embedding_model(self.embedding)
+
+    def _store_embedding_function(self, collection):
+        """Store the collection's model as its embedding function if none is stored yet
+
+        Clients that query with plain text (chroma-mcp) embed with the stored
+        function; collections created before it was stored have none.
+        """
+        if not hasattr(collection, 'configuration_json') or stored_embedding_function(collection):
+            return
+        settings = settings_for_identity(collection_identity(collection), self.embedding)
+        collection.modify(configuration={'embedding_function': chroma_embedding_function(settings)})
+
+    def _check_model(self, collection):
+        """Refuse to write vectors from another model into a collection"""
+        identity = collection_identity(collection)
+        if identity != model_identity(self.embedding):
+            raise ModelMismatchError(
+                f"{collection.name} is embedded with {describe_identity(identity)}, "
+                f"but {describe_identity(model_identity(self.embedding))} is configured. "
+                f"Run: python scripts/migrate-collection.py {self.base_name}"
+            )
+
+    def check_models(self):
+        """Check every existing shard against the configured model
+
+        Raises:
+            ModelMismatchError: A shard was embedded with another model
+        """
+        for name in self.shards():
+            self._check_model(self._get_collection(name, create=False))
+
+    def _layouts(self) -> Dict[str, Optional[str]]:
+        """Map this router's existing collections to the partition mode they were created with"""
+        prefix = f"{self.base_name}{SHARD_SEPARATOR}"
+        layouts = {}
+        for collection in self.client.list_collections():
+            name = _collection_name(collection)
+            if name != self.base_name and not name.startswith(prefix):
+                continue
+            if isinstance(collection, str):
+                collection = self.client.get_collection(name=name)
+            metadata = collection.metadata or {}
+            # Unpartitioned collections carry no partition metadata
+            layouts[name] = metadata.get('partition', 'none' if name == self.base_name else None)
+        return layouts
+
+    def shards(self) -> List[str]:
+        """List existing shard collection names for this router's partition mode"""
+        return sorted(name for name, layout in self._layouts().items() if layout == self.partition)
+
+    def stale_shards(self) -> List[str]:
+        """List collections of this base name created under another partition mode"""
+        return sorted(name for name, layout in self._layouts().items() if layout != self.partition)
+
+    def check_layout(self):
+        """Refuse to use a collection while shards from another partition mode exist
+
+        Raises:
+            StaleLayoutError: Collections from a previous CHROMA_PARTITION remain
+        """
+        stale = self.stale_shards()
+        if stale:
+            raise StaleLayoutError(
+                f"{self.base_name} has {len(stale)} collections from another partition mode "
+                f"({', '.join(stale)}), but CHROMA_PARTITION={self.partition}. "
+                f"Run index.py with --full-reindex to rebuild in the new layout"
+            )
+
+    def drop_stale_shards(self) -> List[str]:
+        """Delete collections created under another partition mode
+
+        Returns:
+            list: Names of the deleted collections
+        """
+        stale = self.stale_shards()
+        for name in stale:
+            self.client.delete_collection(name=name)
+            self._collections.pop(name, None)
+        return stale
+
+    def shards_for_where(self, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Select shards that can match a metadata filter
+
+        Equality and `$in` conditions on the partition key (top level or inside
+        `$and`) narrow the fan-out; anything else queries every shard.
+        """
+        existing = self.shards()
+        if not self.partition_key or not where:
+            return existing
+
+        values = self._partition_values(where)
+        if values is None:
+            return existing
+
+        wanted = {self._shard_name_for_value(str(v)) for v in values}
+        return [name for name in existing if name in wanted]
+
+    def _partition_values(self, where: Dict[str, Any]) -> Optional[set]:
+        """Extract partition key values a filter is restricted to (None = unrestricted)"""
+        if '$and' in where:
+            restricted = None
+            for clause in where['$and']:
+                values = self._partition_values(clause)
+                if values is not None:
+                    restricted = values if restricted is None else restricted & values
+            return restricted
+
+        condition = where.get(self.partition_key)
+        if condition is None:
+            return None
+        if not isinstance(condition, dict):
+            return {condition}
+        if '$eq' in condition:
+            return {condition['$eq']}
+        if '$in' in condition:
+            return set(condition['$in'])
+        return None
+
+    # Fan-out operations
+
+    def query(
+        self,
+        query_texts: Optional[List[str]] = None,
+        query_embeddings: Optional[List[List[float]]] = None,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Query all relevant shards and merge results by distance
+
+        Returns a dict shaped like Chroma's query result (one list per query),
+        so callers can treat a partitioned index like a single collection.
+        `ids` restricts the search to those documents, wherever they are stored.
+        """
+        shard_names = self.shards_for_where(where)
+        num_queries = len(query_embeddings if query_embeddings is not None else query_texts)
+        merged = [[] for _ in range(num_queries)]
+
+        # Embed once per model instead of once per shard
+        embedded = {}
+
+        for name in shard_names:
+            collection = self._get_collection(name, create=False)
+            if collection.count() == 0:
+                continue
+
+            embeddings = query_embeddings
+            if embeddings is None:
+                identity = collection_identity(collection)
+                key = tuple(sorted(identity.items()))
+                if key not in embedded:
+                    settings = settings_for_identity(identity, self.embedding)
+                    embedded[key] = embedding_model(settings)(query_texts)
+                embeddings = embedded[key]
+
+            kwargs = {
+                'query_embeddings': embeddings,
+                'n_results': n_results,
+                'include': ['documents', 'metadatas', 'distances'],
+            }
+            if where:
+                kwargs['where'] = where
+            if where_document:
+                kwargs['where_document'] = where_document
+            if ids:
+                kwargs['ids'] = ids
+
+            result = collection.query(**kwargs)
+
+            for i in range(num_queries):
+                for j, doc_id in enumerate(result['ids'][i]):
+                    merged[i].append((
+                        result['distances'][i][j],
+                        doc_id,
+                        result['documents'][i][j],
+                        result['metadatas'][i][j],
+                    ))
+
+        output = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for hits in merged:
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+            output['distances'].append([hit[0] for hit in hits])
+            output['ids'].append([hit[1] for hit in hits])
+            output['documents'].append([hit[2] for hit in hits])
+            output['metadatas'].append([hit[3] for hit in hits])
+
+        return output
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Delete documents by ID and/or filter from all relevant shards"""
+        for name in self.shards_for_where(where):
+            kwargs = {}
+            if ids:
+                kwargs['ids'] = ids
+            if where:
+                kwargs['where'] = where
+            self._get_collection(name, create=False).delete(**kwargs)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Per-collection index settings
+Loaded from $CLAUDE_CODE_DATA_DIR/collections.json (or CHROMA_COLLECTIONS_CONFIG):
+
+    {
+        "codebase_knowledge": {
+            "hnsw": {"space": "cosine", "M": 32, "construction_ef": 200, "search_ef": 64},
+            "embedding": {"model": "all-MiniLM-L6-v2", "dimensions": 384, "max_tokens": 256, "batch_size": 32}
+        }
+    }
+
+Settings are keyed by base collection name and apply to all of its shards.
+Embedding settings are described in embeddings.py.
+HNSW values are stored as `hnsw:*` collection metadata when a collection is
+created. `space`, `M` and `construction_ef` are fixed from then on;
+`search_ef` is applied to existing collections as well (an index already
+loaded in a process keeps its value until it is reopened). Chroma 1.x keeps
+the live value in the collection configuration and refuses metadata updates
+that touch `hnsw:space`, so the `hnsw:*` metadata of an existing collection
+can be stale; use `live_metadata` when copying it elsewhere.
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from scripts.embeddings import validate_embedding
+
+HNSW_SPACES = ('l2', 'cosine', 'ip')
+
+# Chroma's defaults (1.x), used when a setting is not configured
+HNSW_DEFAULTS = {
+    'space': 'l2',
+    'M': 16,
+    'construction_ef': 100,
+    'search_ef': 100,
+}
+
+# Settings that cannot change once the index is built
+HNSW_IMMUTABLE = ('space', 'M', 'construction_ef')
+
+_config = None
+
+
+def default_config_path() -> Path:
+    """Get the collection settings file path"""
+    configured = os.getenv('CHROMA_COLLECTIONS_CONFIG')
+    if configured:
+        return Path(os.path.expanduser(configured))
+    base_dir = os.path.expanduser(os.getenv('CLAUDE_CODE_DATA_DIR', '~/claude-code-data'))
+    return Path(base_dir) / 'collections.json'
+
+
+def validate_hnsw(hnsw: Dict[str, Any]) -> Dict[str, Any]:
+    """Check HNSW settings
+
+    Raises:
+        ValueError: Unknown setting or invalid value
+    """
+    validated = {}
+    for key, value in hnsw.items():
+        if key not in HNSW_DEFAULTS:
+            raise ValueError(f"Unknown HNSW setting '{key}' (expected: {', '.join(HNSW_DEFAULTS)})")
+        if key == 'space':
+            if value not in HNSW_SPACES:
+                raise ValueError(f"Invalid HNSW space '{value}' (expected: {', '.join(HNSW_SPACES)})")
+            validated[key] = value
+        else:
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f"HNSW {key} must be a positive integer, got {value!r}")
+            validated[key] = value
+    return validated
+
+
+def validate_settings(name: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Check one collection's settings
+
+    Raises:
+        ValueError: Unknown section or invalid value (prefixed with the collection name)
+    """
+    unknown = set(settings) - {'hnsw', 'embedding'}
+    try:
+        if unknown:
+            raise ValueError(f"unknown sections {', '.join(sorted(unknown))} (expected: hnsw, embedding)")
+        validated = {}
+        if 'hnsw' in settings:
+            validated['hnsw'] = validate_hnsw(settings['hnsw'])
+        if 'embedding' in settings:
+            validated['embedding'] = validate_embedding(settings['embedding'])
+    except ValueError as e:
+        raise ValueError(f"{name}: {e}")
+    return validated
+
+
+def load_config(path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Load and validate collection settings (empty if the file does not exist)"""
+    path = path or default_config_path()
+    if not path.exists():
+        return {}
+
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("expected an object keyed by collection name")
+        for name, settings in config.items():
+            config[name] = validate_settings(name, settings)
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"❌ Invalid collection settings in {path}: {e}")
+        sys.exit(1)
+
+    return config
+
+
+def collection_settings(name: str) -> Dict[str, Any]:
+    """Get settings for a base collection name (loaded once per process)"""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config.get(name, {})
+
+
+def hnsw_metadata(hnsw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert HNSW settings to Chroma collection metadata keys"""
+    return {f"hnsw:{key}": value for key, value in hnsw.items()}
+
+
+def hnsw_settings(collection) -> Dict[str, Any]:
+    """Read the effective HNSW settings of an existing collection"""
+    # Chroma 1.x exposes the live index configuration; older versions only metadata
+    configuration = getattr(collection, 'configuration', None) or {}
+    live = configuration.get('hnsw') or {}
+    if live:
+        return {
+            'space': live.get('space', HNSW_DEFAULTS['space']),
+            'M': live.get('max_neighbors', HNSW_DEFAULTS['M']),
+            'construction_ef': live.get('ef_construction', HNSW_DEFAULTS['construction_ef']),
+            'search_ef': live.get('ef_search', HNSW_DEFAULTS['search_ef']),
+        }
+
+    metadata = collection.metadata or {}
+    return {key: metadata.get(f"hnsw:{key}", default) for key, default in HNSW_DEFAULTS.items()}
+
+
+def live_metadata(collection) -> Dict[str, Any]:
+    """Get a collection's metadata with `hnsw:*` keys set from its effective settings
+
+    Keeps keys the collection was created with and adds any that differ from
+    Chroma's defaults (e.g. a search_ef applied later).
+    """
+    metadata = dict(collection.metadata or {})
+    for key, value in hnsw_settings(collection).items():
+        if f"hnsw:{key}" in metadata or value != HNSW_DEFAULTS[key]:
+            metadata[f"hnsw:{key}"] = value
+    return metadata
+
+
+def hnsw_mismatches(collection, hnsw: Dict[str, Any]) -> List[str]:
+    """List configured immutable settings that differ from an existing collection's"""
+    current = hnsw_settings(collection)
+    return [
+        f"{key} {current[key]} (configured {hnsw[key]})"
+        for key in HNSW_IMMUTABLE
+        if key in hnsw and hnsw[key] != current[key]
+    ]
+
+
+def apply_search_ef(collection, search_ef: int) -> bool:
+    """Update search_ef of an existing collection if it differs
+
+    Returns:
+        bool: True if the collection was changed
+    """
+    if hnsw_settings(collection)['search_ef'] == search_ef:
+        return False
+
+    if getattr(collection, 'configuration', None):
+        collection.modify(configuration={'hnsw': {'ef_search': search_ef}})
+    else:
+        # Older Chroma reads search_ef from metadata (modify replaces all of it)
+        metadata = dict(collection.metadata or {})
+        metadata['hnsw:search_ef'] = search_ef
+        collection.modify(metadata=metadata)
+    return True
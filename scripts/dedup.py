@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for indexed documents (MinHash + LSH)
+Keeps signatures of indexed documents in a small SQLite store so new documents
+can be checked against everything already in a collection before embedding.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import hashlib
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').strip().lower() not in ('0', 'false', 'no', 'off')
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.9'))
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+SEED = 1
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def _import_numpy():
+    """Import numpy on first use (installed with chromadb)"""
+    import numpy
+    return numpy
+
+
+def default_db_path(db_file: str = ".dedup-index.sqlite3") -> Path:
+    """Dedup store location (next to the indexer state file)"""
+    base_dir = os.path.expanduser(os.getenv('CLAUDE_CODE_DATA_DIR', '~/claude-code-data'))
+    return Path(base_dir) / db_file
+
+
+def lsh_rows_per_band(threshold: float, num_perm: int = NUM_PERM) -> int:
+    """Pick rows per band so the LSH candidate threshold sits just below `threshold`
+
+    A pair with Jaccard similarity s becomes a candidate with probability
+    1 - (1 - s^r)^b, which rises steeply around (1/b)^(1/r). Candidates are
+    verified against the full signature afterwards, so erring low only costs
+    a few extra comparisons.
+    """
+    best = 1
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = rows
+    return best
+
+
+def _create_schema(conn):
+    """Create (or upgrade) the dedup store tables"""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS signatures (
+            collection TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            PRIMARY KEY (collection, doc_id)
+        );
+        CREATE TABLE IF NOT EXISTS bands (
+            collection TEXT NOT NULL,
+            key BLOB NOT NULL,
+            doc_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bands_lookup ON bands (collection, key);
+        CREATE INDEX IF NOT EXISTS bands_doc ON bands (collection, doc_id);
+        CREATE TABLE IF NOT EXISTS duplicates (
+            collection TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            canonical_id TEXT NOT NULL,
+            similarity REAL NOT NULL,
+            PRIMARY KEY (collection, doc_id)
+        );
+        CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (collection, canonical_id);
+    """)
+    # Stores created before duplicates kept their content
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(duplicates)")}
+    for column in ('document', 'metadata'):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE duplicates ADD COLUMN {column} TEXT")
+    conn.commit()
+
+
+class DedupIndex:
+    """MinHash signatures, LSH buckets and duplicate references per collection
+
+    Only canonical (embedded) documents have signatures. Documents found to be
+    near-duplicates are recorded as references to their canonical document
+    instead of being embedded again, together with their text and metadata:
+    when the canonical document is removed or its content changes, its
+    duplicates are handed back to the caller (as "orphans") to be indexed
+    again instead of disappearing from the index.
+    """
+
+    def __init__(
+        self,
+        db_file: str = ".dedup-index.sqlite3",
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = NUM_PERM
+    ):
+        self.db_path = default_db_path(db_file)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.rows_per_band = lsh_rows_per_band(threshold, num_perm)
+
+        np = _import_numpy()
+        rng = np.random.RandomState(SEED)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by pipeline worker threads; callers serialise access with `lock`
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.lock = threading.RLock()
+        _create_schema(self.conn)
+        self._checked_bands = set()
+
+    # Signatures
+
+    def signature(self, text: str):
+        """MinHash signature of a document's word shingles (None for empty text)"""
+        np = _import_numpy()
+
+        tokens = text.lower().split()
+        if not tokens:
+            return None
+
+        size = min(SHINGLE_SIZE, len(tokens))
+        shingles = {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+        # Universal hashing (a*x + b) mod p per permutation; uint64 wraparound is intended
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(MERSENNE_PRIME) & np.uint64(MAX_HASH)
+        return permuted.min(axis=0).astype('<u4')
+
+    def similarity(self, sig_a, sig_b) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float((sig_a == sig_b).mean())
+
+    def _band_keys(self, signature) -> List[bytes]:
+        rows = self.rows_per_band
+        return [
+            bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes()
+            for band in range(self.num_perm // rows)
+        ]
+
+    def _ensure_bands(self, collection: str):
+        """Rebuild LSH buckets if they were built for a different threshold"""
+        if collection in self._checked_bands:
+            return
+        self._checked_bands.add(collection)
+
+        key = f"rows_per_band:{collection}"
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row and int(row[0]) == self.rows_per_band:
+            return
+
+        np = _import_numpy()
+        self.conn.execute("DELETE FROM bands WHERE collection = ?", (collection,))
+        for doc_id, blob in self.conn.execute(
+            "SELECT doc_id, signature FROM signatures WHERE collection = ?", (collection,)
+        ).fetchall():
+            signature = np.frombuffer(blob, dtype='<u4')
+            self.conn.executemany(
+                "INSERT INTO bands (collection, key, doc_id) VALUES (?, ?, ?)",
+                [(collection, band_key, doc_id) for band_key in self._band_keys(signature)]
+            )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, str(self.rows_per_band))
+        )
+        self.conn.commit()
+
+    # Lookups
+
+    def find_duplicate(self, collection: str, doc_id: str, signature) -> Optional[Tuple[str, float]]:
+        """Find the most similar indexed document at or above the threshold
+
+        Returns:
+            tuple: (canonical_id, similarity), or None if the document is unique
+        """
+        self._ensure_bands(collection)
+        np = _import_numpy()
+
+        keys = self._band_keys(signature)
+        placeholders = ','.join('?' * len(keys))
+        candidates = {
+            row[0] for row in self.conn.execute(
+                f"SELECT DISTINCT doc_id FROM bands WHERE collection = ? AND key IN ({placeholders})",
+                [collection] + keys
+            )
+        }
+        candidates.discard(doc_id)
+        if not candidates:
+            return None
+
+        best = None
+        placeholders = ','.join('?' * len(candidates))
+        for candidate_id, blob in self.conn.execute(
+            f"SELECT doc_id, signature FROM signatures WHERE collection = ? AND doc_id IN ({placeholders})",
+            [collection] + sorted(candidates)
+        ):
+            score = self.similarity(signature, np.frombuffer(blob, dtype='<u4'))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate_id, score)
+        return best
+
+    def duplicate_ids(self, collection: str, doc_ids: List[str]) -> set:
+        """IDs among `doc_ids` that are stored as references to a canonical document"""
+        if not doc_ids:
+            return set()
+        placeholders = ','.join('?' * len(doc_ids))
+        return {
+            row[0] for row in self.conn.execute(
+                f"SELECT doc_id FROM duplicates WHERE collection = ? AND doc_id IN ({placeholders})",
+                [collection] + list(doc_ids)
+            )
+        }
+
+    def duplicates_of(self, collection: str, canonical_id: str) -> List[str]:
+        """IDs of documents stored as duplicates of a canonical document"""
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT doc_id FROM duplicates WHERE collection = ? AND canonical_id = ? ORDER BY doc_id",
+                (collection, canonical_id)
+            )
+        ]
+
+    def duplicate_documents(self, collection: str) -> List[Dict[str, Any]]:
+        """All documents stored as duplicate references, as {'id', 'text', 'metadata'} dicts"""
+        return [
+            {'id': doc_id, 'text': document, 'metadata': json.loads(metadata) if metadata else None}
+            for doc_id, document, metadata in self.conn.execute(
+                "SELECT doc_id, document, metadata FROM duplicates WHERE collection = ?", (collection,)
+            )
+        ]
+
+    def duplicate_references(self, collection: str) -> List[Dict[str, Any]]:
+        """Duplicate references with their canonical ID, as {'id', 'canonical_id', 'text', 'metadata'} dicts"""
+        return [
+            {
+                'id': doc_id,
+                'canonical_id': canonical_id,
+                'text': document,
+                'metadata': json.loads(metadata) if metadata else None,
+            }
+            for doc_id, canonical_id, document, metadata in self.conn.execute(
+                "SELECT doc_id, canonical_id, document, metadata FROM duplicates WHERE collection = ?",
+                (collection,)
+            )
+        ]
+
+    # Updates
+
+    def add(self, collection: str, doc_id: str, signature) -> List[Dict[str, Any]]:
+        """Register an embedded (canonical) document
+
+        Returns:
+            list: Orphaned duplicates, if the document was canonical before
+            with different content
+        """
+        self._ensure_bands(collection)
+        row = self.conn.execute(
+            "SELECT signature FROM signatures WHERE collection = ? AND doc_id = ?", (collection, doc_id)
+        ).fetchone()
+        orphans = []
+        if row is None or bytes(row[0]) != signature.tobytes():
+            orphans = self._release(collection, [doc_id])
+
+        self._remove(collection, [doc_id])
+        self.conn.execute(
+            "INSERT INTO signatures (collection, doc_id, signature) VALUES (?, ?, ?)",
+            (collection, doc_id, signature.tobytes())
+        )
+        self.conn.executemany(
+            "INSERT INTO bands (collection, key, doc_id) VALUES (?, ?, ?)",
+            [(collection, key, doc_id) for key in self._band_keys(signature)]
+        )
+        return orphans
+
+    def add_duplicate(
+        self,
+        collection: str,
+        doc_id: str,
+        canonical_id: str,
+        similarity: float,
+        document: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Record a document as a reference to its canonical document
+
+        The document's text and metadata are kept so it can be indexed on its
+        own if the canonical document goes away.
+
+        Returns:
+            list: Orphaned duplicates, if the document was canonical before
+        """
+        orphans = self._release(collection, [doc_id])
+        self._remove(collection, [doc_id])
+        self.conn.execute(
+            "INSERT INTO duplicates (collection, doc_id, canonical_id, similarity, document, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                collection,
+                doc_id,
+                canonical_id,
+                similarity,
+                document,
+                json.dumps(metadata) if metadata is not None else None
+            )
+        )
+        return orphans
+
+    def _release(self, collection: str, canonical_ids: List[str]) -> List[Dict[str, Any]]:
+        """Drop references to canonical documents and return the referencing documents
+
+        Returns:
+            list: {'id', 'text', 'metadata'} dicts; `text` is None for references
+            recorded before duplicates kept their content
+        """
+        orphans = []
+        for canonical_id in canonical_ids:
+            rows = self.conn.execute(
+                "SELECT doc_id, document, metadata FROM duplicates WHERE collection = ? AND canonical_id = ?",
+                (collection, canonical_id)
+            ).fetchall()
+            self.conn.execute(
+                "DELETE FROM duplicates WHERE collection = ? AND canonical_id = ?",
+                (collection, canonical_id)
+            )
+            orphans.extend(
+                {'id': doc_id, 'text': document, 'metadata': json.loads(metadata) if metadata else None}
+                for doc_id, document, metadata in rows
+            )
+        return orphans
+
+    def _remove(self, collection: str, doc_ids: List[str]):
+        for doc_id in doc_ids:
+            self.conn.execute("DELETE FROM signatures WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+            self.conn.execute("DELETE FROM bands WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+            self.conn.execute("DELETE FROM duplicates WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+
+    def forget(self, collection: str, doc_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Drop documents removed from the collection
+
+        Returns:
+            list: Orphaned duplicates of removed canonical documents, which the
+            caller must index again (see IndexPipeline.restore)
+        """
+        doc_ids = list(doc_ids)
+        removed = set(doc_ids)
+        self._remove(collection, doc_ids)
+        orphans = [orphan for orphan in self._release(collection, doc_ids) if orphan['id'] not in removed]
+        self.conn.commit()
+        return orphans
+
+    def reset(self, collection: str):
+        """Drop all dedup data for a collection (it is rebuilt by backfill)"""
+        for table in ('signatures', 'bands', 'duplicates'):
+            self.conn.execute(f"DELETE FROM {table} WHERE collection = ?", (collection,))
+        self.conn.execute(
+            "DELETE FROM meta WHERE key IN (?, ?)",
+            (f"backfilled:{collection}", f"rows_per_band:{collection}")
+        )
+        self.conn.commit()
+        self._checked_bands.discard(collection)
+
+    # Snapshots
+
+    def _select(self, documents: Dict[str, Iterable[str]]):
+        """Fill the temporary `selected` table with (collection, canonical doc ID) pairs"""
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS selected (collection TEXT, doc_id TEXT, PRIMARY KEY (collection, doc_id))"
+        )
+        self.conn.execute("DELETE FROM selected")
+        for collection, doc_ids in documents.items():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO selected (collection, doc_id) VALUES (?, ?)",
+                ((collection, doc_id) for doc_id in doc_ids)
+            )
+
+    def _copy_selected(self, source: str, target: str):
+        """Copy signatures of selected documents and references to them between attached stores"""
+        self.conn.execute(f"""
+            INSERT OR REPLACE INTO {target}.signatures (collection, doc_id, signature)
+            SELECT s.collection, s.doc_id, s.signature FROM {source}.signatures s
+            JOIN selected USING (collection, doc_id)
+        """)
+        # Snapshot stores written before duplicates kept their content lack these columns
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA {source}.table_info(duplicates)")}
+        content = ', '.join(f"d.{c}" if c in columns else 'NULL' for c in ('document', 'metadata'))
+        self.conn.execute(f"""
+            INSERT OR REPLACE INTO {target}.duplicates (collection, doc_id, canonical_id, similarity, document, metadata)
+            SELECT d.collection, d.doc_id, d.canonical_id, d.similarity, {content} FROM {source}.duplicates d
+            JOIN selected s ON s.collection = d.collection AND s.doc_id = d.canonical_id
+        """)
+
+    def export_documents(self, path: Path, documents: Dict[str, Iterable[str]]):
+        """Write the dedup data of some documents to a new store
+
+        Args:
+            path: SQLite file to create
+            documents: Logical collection name → IDs of its exported documents
+        """
+        target = sqlite3.connect(str(path))
+        _create_schema(target)
+        target.close()
+
+        self.conn.commit()
+        self.conn.execute("ATTACH DATABASE ? AS snapshot", (str(path),))
+        try:
+            self._select(documents)
+            self._copy_selected('main', 'snapshot')
+            self.conn.commit()
+        finally:
+            self.conn.execute("DETACH DATABASE snapshot")
+
+    def merge(self, path: Path, documents: Dict[str, Iterable[str]]) -> int:
+        """Add a snapshot store's data for the imported documents to this store
+
+        Only signatures of `documents` and references to them are taken over;
+        anything else in the snapshot store describes documents that were not
+        imported. LSH buckets are rebuilt on the next lookup.
+
+        Args:
+            path: Snapshot dedup store
+            documents: Logical collection name → IDs of the imported documents
+
+        Returns:
+            int: Number of signatures and references merged
+        """
+        self.conn.commit()
+        self.conn.execute("ATTACH DATABASE ? AS snapshot", (str(path),))
+        try:
+            self._select(documents)
+            # Imported documents replace whatever this store knew about the same IDs
+            incoming = """
+                SELECT collection, doc_id FROM selected
+                UNION
+                SELECT d.collection, d.doc_id FROM snapshot.duplicates d
+                JOIN selected s ON s.collection = d.collection AND s.doc_id = d.canonical_id
+            """
+            for table in ('signatures', 'bands', 'duplicates'):
+                self.conn.execute(f"DELETE FROM {table} WHERE (collection, doc_id) IN ({incoming})")
+            before = self.conn.total_changes
+            self._copy_selected('snapshot', 'main')
+            merged = self.conn.total_changes - before
+            for collection in documents:
+                self.conn.execute("DELETE FROM meta WHERE key = ?", (f"rows_per_band:{collection}",))
+                self._checked_bands.discard(collection)
+            self.conn.commit()
+        finally:
+            self.conn.execute("DETACH DATABASE snapshot")
+        return merged
+
+    def clear_backfilled(self, collection: str):
+        """Have the next run register a collection's documents again"""
+        self.conn.execute("DELETE FROM meta WHERE key = ?", (f"backfilled:{collection}",))
+        self.conn.commit()
+
+    def is_backfilled(self, collection: str) -> bool:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (f"backfilled:{collection}",)
+        ).fetchone()
+        return row is not None
+
+    def backfill(self, collection: str, chroma_collections: Iterable[Any], page_size: int = 500) -> int:
+        """Compute signatures for documents indexed before dedup was enabled
+
+        Args:
+            collection: Logical collection name signatures are stored under
+            chroma_collections: Chroma collections (shards) holding its documents
+
+        Returns:
+            int: Number of documents registered
+        """
+        added = 0
+        for chroma_collection in chroma_collections:
+            offset = 0
+            while True:
+                page = chroma_collection.get(include=['documents'], limit=page_size, offset=offset)
+                if not page['ids']:
+                    break
+                for doc_id, text in zip(page['ids'], page['documents']):
+                    signature = self.signature(text or '')
+                    if signature is not None:
+                        self.add(collection, doc_id, signature)
+                        added += 1
+                offset += len(page['ids'])
+                self.conn.commit()
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (f"backfilled:{collection}", '1')
+        )
+        self.conn.commit()
+        return added
+
+    def stats(self, collection: str) -> Dict[str, int]:
+        """Number of canonical documents and stored duplicate references"""
+        canonical = self.conn.execute(
+            "SELECT COUNT(*) FROM signatures WHERE collection = ?", (collection,)
+        ).fetchone()[0]
+        duplicates = self.conn.execute(
+            "SELECT COUNT(*) FROM duplicates WHERE collection = ?", (collection,)
+        ).fetchone()[0]
+        return {'canonical': canonical, 'duplicates': duplicates}
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Embedding models for the knowledge collections
+Configured per collection in collections.json (see collection_config.py):
+
+    {
+        "slack_knowledge": {
+            "embedding": {"model": "paraphrase-MiniLM-L3-v2", "dimensions": 384, "max_tokens": 128, "batch_size": 64}
+        }
+    }
+
+The default model is Chroma's bundled ONNX all-MiniLM-L6-v2. Any other model
+name is loaded with sentence-transformers (optional dependency).
+
+Every collection records the model it was embedded with in its metadata
+(`embedding:model`, `embedding:dimensions`); vectors from different models
+are not comparable, so writing with another model is refused. The model is
+also stored as the collection's Chroma embedding function, so clients that
+query with plain text (e.g. chroma-mcp) embed queries with the same model.
+"""
+
+import sys
+import threading
+from typing import Optional, Dict, Any, List
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+
+DEFAULT_EMBEDDING = {
+    'model': DEFAULT_MODEL,
+    'dimensions': 384,
+    'max_tokens': 256,
+    'batch_size': 32,
+}
+
+MODEL_KEY = 'embedding:model'
+DIMENSIONS_KEY = 'embedding:dimensions'
+
+_models = {}
+_chroma_functions = {}
+_models_lock = threading.Lock()
+
+
+class ModelMismatchError(RuntimeError):
+    """A collection was embedded with a different model than the configured one"""
+
+
+def validate_embedding(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Check embedding settings and fill in defaults
+
+    Raises:
+        ValueError: Unknown setting or invalid value
+    """
+    for key in settings:
+        if key not in DEFAULT_EMBEDDING:
+            raise ValueError(f"Unknown embedding setting '{key}' (expected: {', '.join(DEFAULT_EMBEDDING)})")
+
+    model = settings.get('model', DEFAULT_MODEL)
+    if not isinstance(model, str) or not model.strip():
+        raise ValueError(f"Embedding model must be a name, got {model!r}")
+
+    if model != DEFAULT_MODEL and 'dimensions' not in settings:
+        raise ValueError(f"Embedding model '{model}' needs 'dimensions'")
+
+    validated = dict(DEFAULT_EMBEDDING, **settings)
+    for key in ('dimensions', 'max_tokens', 'batch_size'):
+        value = validated[key]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"Embedding {key} must be a positive integer, got {value!r}")
+
+    if model == DEFAULT_MODEL:
+        if validated['dimensions'] != DEFAULT_EMBEDDING['dimensions']:
+            raise ValueError(f"{DEFAULT_MODEL} has {DEFAULT_EMBEDDING['dimensions']} dimensions")
+        if validated['max_tokens'] > DEFAULT_EMBEDDING['max_tokens']:
+            raise ValueError(f"{DEFAULT_MODEL} supports at most {DEFAULT_EMBEDDING['max_tokens']} tokens")
+
+    return validated
+
+
+def model_identity(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Collection metadata identifying the model a collection is embedded with"""
+    return {MODEL_KEY: settings['model'], DIMENSIONS_KEY: settings['dimensions']}
+
+
+def collection_identity(collection) -> Dict[str, Any]:
+    """Get the model identity recorded on a collection
+
+    Collections created before models were pinned were all embedded with
+    Chroma's default model.
+    """
+    return metadata_identity(collection.metadata)
+
+
+def metadata_identity(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Get the model identity recorded in collection metadata"""
+    metadata = metadata or {}
+    if MODEL_KEY not in metadata:
+        return model_identity(DEFAULT_EMBEDDING)
+    return {MODEL_KEY: metadata[MODEL_KEY], DIMENSIONS_KEY: metadata.get(DIMENSIONS_KEY)}
+
+
+def describe_identity(identity: Dict[str, Any]) -> str:
+    return f"{identity[MODEL_KEY]} ({identity[DIMENSIONS_KEY]}d)"
+
+
+def settings_for_identity(identity: Dict[str, Any], configured: Dict[str, Any]) -> Dict[str, Any]:
+    """Settings to embed queries for a collection built with `identity`
+
+    Uses the configured settings when they match, otherwise the model's defaults
+    (e.g. the previous model while a migration is running).
+    """
+    if model_identity(configured) == identity:
+        return configured
+    return validate_embedding({'model': identity[MODEL_KEY], 'dimensions': identity[DIMENSIONS_KEY]})
+
+
+class EmbeddingModel:
+    """Embeds texts with one configured model, loading it on first use"""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.model = settings['model']
+        self.dimensions = settings['dimensions']
+        self.max_tokens = settings['max_tokens']
+        self.batch_size = settings['batch_size']
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    @property
+    def identity(self) -> Dict[str, Any]:
+        return model_identity(self.settings)
+
+    def _load(self):
+        """Load the model (thread-safe, once)"""
+        with self._lock:
+            if self._encoder is None:
+                if self.model == DEFAULT_MODEL:
+                    self._encoder = self._load_default()
+                else:
+                    self._encoder = self._load_sentence_transformer()
+            return self._encoder
+
+    def _load_default(self):
+        from scripts.indexing_pipeline import import_chromadb
+        import_chromadb()
+        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+        # One instance for the whole run (DefaultEmbeddingFunction reloads the model on every call)
+        function = ONNXMiniLM_L6_V2()
+        if self.max_tokens < DEFAULT_EMBEDDING['max_tokens']:
+            # The bundled tokenizer pads every input to 256 tokens; shorter inputs are faster.
+            # A first call downloads the model; `tokenizer` is then the cached instance it uses
+            # (stable across the chromadb versions pinned in install.sh).
+            function(['warm up'])
+            function.tokenizer.enable_truncation(max_length=self.max_tokens)
+            function.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]', length=self.max_tokens)
+        return function
+
+    def _load_sentence_transformer(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            print("❌ sentence-transformers not installed. Run: pip install sentence-transformers")
+            sys.exit(1)
+
+        model = SentenceTransformer(self.model)
+        model.max_seq_length = self.max_tokens
+        dimensions = model.get_sentence_embedding_dimension()
+        if dimensions != self.dimensions:
+            raise ValueError(f"Model {self.model} has {dimensions} dimensions, configured {self.dimensions}")
+
+        def encode(texts):
+            return model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return encode
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches of `batch_size`"""
+        encoder = self._load()
+
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            for vector in encoder(texts[start:start + self.batch_size]):
+                if len(vector) != self.dimensions:
+                    raise ValueError(
+                        f"Model {self.model} returned {len(vector)} dimensions, configured {self.dimensions}"
+                    )
+                vectors.append(list(map(float, vector)))
+        return vectors
+
+
+def embedding_model(settings: Optional[Dict[str, Any]] = None) -> EmbeddingModel:
+    """Get the shared model instance for these settings (loaded at most once per process)"""
+    settings = settings or DEFAULT_EMBEDDING
+    key = tuple(sorted(settings.items()))
+    with _models_lock:
+        if key not in _models:
+            _models[key] = EmbeddingModel(settings)
+        return _models[key]
+
+
+def chroma_embedding_function(settings: Dict[str, Any]):
+    """Chroma embedding function for a model, to store in a collection's configuration
+
+    Vectors are always computed with EmbeddingModel; the stored function is
+    what other Chroma clients use to embed `query_texts`.
+    """
+    from scripts.indexing_pipeline import import_chromadb
+    import_chromadb()
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction, SentenceTransformerEmbeddingFunction
+
+    model = settings['model']
+    with _models_lock:
+        if model not in _chroma_functions:
+            if model == DEFAULT_MODEL:
+                _chroma_functions[model] = DefaultEmbeddingFunction()
+            else:
+                try:
+                    _chroma_functions[model] = SentenceTransformerEmbeddingFunction(
+                        model_name=model,
+                        normalize_embeddings=True
+                    )
+                except ValueError:
+                    print("❌ sentence-transformers not installed. Run: pip install sentence-transformers")
+                    sys.exit(1)
+        return _chroma_functions[model]
+
+
+def stored_embedding_function(collection) -> Optional[str]:
+    """Name of the embedding function stored in a collection's configuration (None if unset)"""
+    configuration = getattr(collection, 'configuration_json', None) or {}
+    stored = configuration.get('embedding_function') or {}
+    return stored.get('name')
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+GitLab source for the unified indexer
+Indexes repository code, commits and MRs into the codebase_knowledge collection
+
+Supports incremental updates by default (only indexes changed files since last run).
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import requests
+from pathlib import Path
+
+from scripts.indexing_pipeline import IndexSource, IndexPipeline
+from scripts.staged_pipeline import parse_workers
+from scripts.chroma_router import partition_for
+
+# Configuration
+GITLAB_TOKEN = os.getenv('GITLAB_PERSONAL_ACCESS_TOKEN')
+GITLAB_URL = os.getenv('GITLAB_API_URL', 'https://git.9yards.nl/api/v4')
+CLONE_DIR = '/tmp/gitlab-index'
+REPOS = os.getenv('GITLAB_REPOS', '').split(',')
+# Worker threads per code indexing stage (file reads are I/O bound, so they get the most)
+PIPELINE_WORKERS = parse_workers(
+    os.getenv('CODE_PIPELINE_WORKERS', ''),
+    {'read': 4, 'chunk': 1, 'embed': 1, 'write': 1}
+)
+
+COLLECTION_NAME = "codebase_knowledge"
+COLLECTION_METADATA = {"description": "Indexed code, commits, and MRs"}
+
+CODE_EXTENSIONS = {'.php', '.js', '.vue', '.py', '.md', '.xml', '.json'}
+EXCLUDED_DIRS = {'vendor', 'node_modules', '.git', 'var', 'pub/static'}
+
+
+def import_git():
+    """Import GitPython on first use"""
+    try:
+        import git
+    except ImportError:
+        print("❌ gitpython not installed. Run: pip install gitpython")
+        sys.exit(1)
+    return git
+
+def codebase_pipeline(ctx, dedup=False):
+    """Pipeline for the (optionally partitioned) codebase_knowledge collection"""
+    return IndexPipeline(
+        ctx,
+        COLLECTION_NAME,
+        partition=partition_for(COLLECTION_NAME),
+        metadata=COLLECTION_METADATA,
+        dedup=dedup
+    )
+
+def get_project_id(repo_path):
+    """Get GitLab project ID from path"""
+    encoded_path = repo_path.replace('/', '%2F')
+    resp = requests.get(
+        f'{GITLAB_URL}/projects/{encoded_path}',
+        headers={'PRIVATE-TOKEN': GITLAB_TOKEN}
+    )
+
+    if resp.ok:
+        return resp.json()['id']
+    else:
+        print(f"  ❌ Failed to get project ID: {resp.json().get('message')}")
+        return None
+
+def clone_or_pull_repo(repo_path):
+    """Clone repository or pull if exists"""
+    git = import_git()
+    local_path = Path(CLONE_DIR) / repo_path
+    git_url = f"https://oauth2:{GITLAB_TOKEN}@{GITLAB_URL.replace('/api/v4', '')}/{repo_path}.git"
+
+    if local_path.exists():
+        print(f"  📥 Pulling latest changes...")
+        repo = git.Repo(local_path)
+        repo.remotes.origin.pull()
+    else:
+        print(f"  📥 Cloning repository...")
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        git.Repo.clone_from(git_url, local_path)
+
+    return local_path
+
+def get_changed_files(local_path, last_commit_sha=None):
+    """Get list of changed files since last commit
+
+    Args:
+        local_path: Local repository path
+        last_commit_sha: Last indexed commit SHA, or None for all files
+
+    Returns:
+        tuple: (changed_files list, deleted_files list, latest_commit_sha)
+    """
+    git = import_git()
+    repo = git.Repo(local_path)
+    latest_sha = repo.head.commit.hexsha
+
+    if not last_commit_sha:
+        # First run - index all files
+        return ([], [], latest_sha)
+
+    try:
+        # Get diff between last indexed commit and current HEAD
+        diff = repo.git.diff(
+            '--name-status',
+            last_commit_sha,
+            'HEAD'
+        )
+
+        changed_files = []
+        deleted_files = []
+
+        for line in diff.split('\n'):
+            if not line.strip():
+                continue
+
+            parts = line.split('\t')
+            if len(parts) < 2:
+                continue
+
+            status = parts[0]
+            file_path = parts[1]
+
+            if status == 'D':  # Deleted
+                deleted_files.append(file_path)
+            else:  # Added, Modified, Renamed, etc.
+                changed_files.append(file_path)
+
+        return (changed_files, deleted_files, latest_sha)
+
+    except git.exc.GitCommandError as e:
+        print(f"\n⚠️  Git diff failed (possibly force-pushed?): {e}")
+        # Fallback to full reindex if git history changed
+        return ([], [], latest_sha)
+
+
+def is_code_file(file_path):
+    """Check whether a path is an indexable code file (no file contents are read)"""
+    # Skip if in excluded directory
+    if any(excluded in file_path.parts for excluded in EXCLUDED_DIRS):
+        return False
+
+    if file_path.suffix not in CODE_EXTENSIONS:
+        return False
+
+    return file_path.is_file()
+
+def read_code_file(repo_path, local_path, file_path):
+    """Read a code file into a pipeline document
+
+    Returns:
+        dict: Document, or None for unreadable, very small or very large files
+    """
+    try:
+        content = file_path.read_text(encoding='utf-8')
+    except Exception:
+        return None
+
+    # Skip very small or very large files
+    if len(content) < 100 or len(content) > 100000:
+        return None
+
+    relative_path = file_path.relative_to(local_path)
+
+    return {
+        'id': f"code_{repo_path}_{relative_path}".replace('/', '_'),
+        'text': content,
+        'metadata': {
+            'type': 'code',
+            'source': 'gitlab',
+            'repo': repo_path,
+            'file': str(relative_path),
+            'language': file_path.suffix[1:],
+            # Lets changed-file runs skip files whose content did not change
+            'content_hash': hashlib.sha1(content.encode('utf-8')).hexdigest()
+        }
+    }
+
+def format_pipeline_report(report):
+    """One-line summary of stage utilisation and queue depths"""
+    stages = ', '.join(
+        f"{name} {info['busy']:.1f}s×{info['workers']}" for name, info in report['stages'].items()
+    )
+    queues = ', '.join(
+        f"{name} {info['max']}/{info['avg']:.1f} of {info['size']}" for name, info in report['queues'].items()
+    )
+    return f"busy {stages}; queues (max/avg) {queues}"
+
+def index_code_files(ctx, repo_path, local_path, changed_files=None):
+    """Index code files with meaningful content
+
+    Files are read, chunked, embedded and written by concurrent pipeline
+    stages (see CODE_PIPELINE_WORKERS) connected by bounded queues.
+
+    Args:
+        ctx: Index run context
+        repo_path: GitLab repo path (e.g., 'group/project')
+        local_path: Local clone path
+        changed_files: List of changed files to index (None = all files)
+
+    Returns:
+        list: Paths of all indexed files
+    """
+    if changed_files is not None and len(changed_files) > 0:
+        print(f"  📄 Indexing {len(changed_files)} changed files...", end='', flush=True)
+        files_to_process = [Path(local_path) / f for f in changed_files]
+        # Changed files are re-checked by content hash even though their IDs exist
+        skip_existing = False
+    elif changed_files is not None:
+        print(f"  📄 No changed files to index")
+        return []
+    else:
+        print(f"  📄 Indexing all code files...", end='', flush=True)
+        files_to_process = Path(local_path).rglob('*')
+        skip_existing = not ctx.full_reindex
+
+    unread = [0]
+    unread_lock = threading.Lock()
+    documents = {}
+
+    def read(file_path):
+        doc = read_code_file(repo_path, local_path, file_path)
+        with unread_lock:
+            if doc is None:
+                unread[0] += 1
+            else:
+                documents[doc['id']] = doc['metadata']['file']
+        return doc
+
+    # Copied modules and generated files across repos are stored as references
+    stats = codebase_pipeline(ctx, dedup=True).run_staged(
+        (file_path for file_path in files_to_process if is_code_file(file_path)),
+        read,
+        skip_existing=skip_existing,
+        workers=PIPELINE_WORKERS
+    )
+    skipped = stats['skipped'] + unread[0]
+
+    ctx.record('gitlab', indexed=stats['indexed'], skipped=skipped, duplicates=stats['duplicates'])
+    print(f" indexed {stats['indexed']}, skipped {skipped}, duplicates {stats['duplicates']}")
+    if stats['restored']:
+        # Duplicates of files whose content changed
+        ctx.record('gitlab', restored=stats['restored'])
+        print(f"  ♻️  Re-indexed {stats['restored']} copies of changed files")
+    print(f"  📊 Pipeline: {format_pipeline_report(stats['pipeline'])}")
+    return [documents[doc_id] for doc_id in stats['ids']]
+
+
+def remove_deleted_files(ctx, repo_path, deleted_files):
+    """Remove deleted files from Chroma collection
+
+    Args:
+        ctx: Index run context
+        repo_path: GitLab repo path
+        deleted_files: List of deleted file paths
+    """
+    if not deleted_files:
+        return
+
+    collection = codebase_pipeline(ctx).router.collection_for({'type': 'code', 'repo': repo_path})
+
+    print(f"  🗑️  Removing {len(deleted_files)} deleted files...", end='', flush=True)
+
+    doc_ids = [f"code_{repo_path}_{file_path}".replace('/', '_') for file_path in deleted_files]
+    try:
+        # Files that were never indexed are ignored by delete
+        collection.delete(ids=doc_ids)
+        removed = len(doc_ids)
+    except Exception:
+        removed = 0
+
+    restored = 0
+    if ctx.dedup:
+        # Copies of removed files in other repos were only stored as references
+        orphans = ctx.dedup.forget(COLLECTION_NAME, doc_ids)
+        if orphans:
+            restored = codebase_pipeline(ctx, dedup=True).restore(orphans)
+            ctx.record('gitlab', restored=restored)
+
+    print(f" removed {removed}" + (f", re-indexed {restored} copies" if restored else ""))
+
+def commit_documents(local_path, repo_path, stats):
+    """Convert meaningful commits into pipeline documents"""
+    git = import_git()
+    repo = git.Repo(local_path)
+
+    # Last 500 commits
+    for commit in repo.iter_commits('main', max_count=500):
+        message = commit.message.strip()
+
+        # Skip merge commits and trivial messages
+        if message.startswith('Merge') or len(message) < 20:
+            stats['skipped'] += 1
+            continue
+
+        yield {
+            'id': f"commit_{repo_path}_{commit.hexsha}".replace('/', '_'),
+            'text': message,
+            'metadata': {
+                'type': 'commit',
+                'source': 'gitlab',
+                'repo': repo_path,
+                'sha': commit.hexsha[:8],
+                'author': commit.author.name,
+                'date': commit.committed_datetime.isoformat()
+            }
+        }
+
+def index_commits(ctx, local_path, repo_path):
+    """Index meaningful commit messages"""
+    print(f"  📝 Indexing commits...", end='', flush=True)
+
+    read_stats = {'skipped': 0}
+    stats = codebase_pipeline(ctx).run(commit_documents(local_path, repo_path, read_stats))
+    skipped = stats['skipped'] + read_stats['skipped']
+
+    ctx.record('gitlab', indexed=stats['indexed'], skipped=skipped)
+    print(f" indexed {stats['indexed']}, skipped {skipped}")
+
+def merge_request_documents(merge_requests, project_id, repo_path, stats):
+    """Convert merged MRs into pipeline documents"""
+    for mr in merge_requests:
+        # Combine title + description
+        content = f"{mr['title']}\n\n{mr.get('description', '')}"
+
+        if len(content) < 30:
+            stats['skipped'] += 1
+            continue
+
+        yield {
+            'id': f"mr_{project_id}_{mr['iid']}",
+            'text': content,
+            'metadata': {
+                'type': 'merge_request',
+                'source': 'gitlab',
+                'repo': repo_path,
+                'mr_id': mr['iid'],
+                'author': mr['author']['username'],
+                'merged_at': mr.get('merged_at') or '',
+                'web_url': mr['web_url']
+            }
+        }
+
+def index_merge_requests(ctx, project_id, repo_path):
+    """Index MR descriptions and discussions"""
+    print(f"  🔀 Indexing merge requests...", end='', flush=True)
+
+    # Get last 100 merged MRs
+    resp = requests.get(
+        f'{GITLAB_URL}/projects/{project_id}/merge_requests',
+        headers={'PRIVATE-TOKEN': GITLAB_TOKEN},
+        params={'state': 'merged', 'per_page': 100, 'order_by': 'updated_at'}
+    )
+
+    if not resp.ok:
+        print(f" ❌ Failed to fetch MRs")
+        return
+
+    read_stats = {'skipped': 0}
+    stats = codebase_pipeline(ctx).run(
+        merge_request_documents(resp.json(), project_id, repo_path, read_stats)
+    )
+    skipped = stats['skipped'] + read_stats['skipped']
+
+    ctx.record('gitlab', indexed=stats['indexed'], skipped=skipped)
+    print(f" indexed {stats['indexed']}, skipped {skipped}")
+
+
+class GitLabSource(IndexSource):
+    """Indexes GitLab code, commits and merge requests into codebase_knowledge"""
+
+    name = 'gitlab'
+    title = 'GitLab Codebase Indexing'
+
+    def check_config(self):
+        if not GITLAB_TOKEN:
+            return "GITLAB_PERSONAL_ACCESS_TOKEN not set"
+        if not REPOS or REPOS == ['']:
+            return "GITLAB_REPOS not set (comma-separated list like: group/project1,group/project2)"
+        return None
+
+    def run(self, ctx):
+        repos = [r.strip() for r in REPOS if r.strip()]
+
+        print(f"🧩 Partitioning: {partition_for(COLLECTION_NAME)}")
+        print(f"📦 Repositories: {len(repos)}")
+        print()
+
+        Path(CLONE_DIR).mkdir(parents=True, exist_ok=True)
+
+        for repo_path in repos:
+            print(f"📦 Processing {repo_path}...")
+
+            try:
+                local_path = clone_or_pull_repo(repo_path)
+            except Exception as e:
+                print(f"  ❌ Failed to clone/pull repository: {e}")
+                continue
+
+            # Get last indexed commit SHA for incremental updates
+            last_commit_sha = None
+            if not ctx.full_reindex:
+                repo_state = ctx.state.get_gitlab_repo_state(repo_path)
+                if repo_state:
+                    last_commit_sha = repo_state.get('last_commit_sha')
+
+            # Determine what changed since last run
+            changed_files, deleted_files, latest_sha = get_changed_files(
+                local_path,
+                last_commit_sha
+            )
+
+            # Handle file deletions
+            if deleted_files:
+                remove_deleted_files(ctx, repo_path, deleted_files)
+
+            # Index changed files (or all files on first run / full reindex)
+            indexed_files = index_code_files(
+                ctx,
+                repo_path,
+                local_path,
+                changed_files=changed_files if last_commit_sha else None
+            )
+
+            # Only index commits and MRs on full reindex (they're less frequently changing)
+            if ctx.full_reindex or not last_commit_sha:
+                index_commits(ctx, local_path, repo_path)
+                project_id = get_project_id(repo_path)
+                if project_id:
+                    index_merge_requests(ctx, project_id, repo_path)
+            else:
+                print(f"  ℹ️  Skipping commits/MRs (incremental mode)")
+
+            # Update state with latest commit SHA
+            ctx.state.update_gitlab_repo(repo_path, latest_sha, indexed_files)
+
+            print()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unified knowledge indexer (Slack + GitLab) into Chroma
+Run: source .venv/bin/activate && python scripts/index.py
+
+Runs every configured source in one process through the shared pipeline.
+Supports incremental updates by default; use --full-reindex to rebuild from scratch.
+Use --source to run a subset (e.g. --source slack).
+"""
+
+import sys
+import time
+import argparse
+import traceback
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.indexer_state import IndexerState
+from scripts.indexing_pipeline import IndexContext, CHROMA_PATH
+from scripts.dedup import DEDUP_ENABLED, DEDUP_THRESHOLD
+from scripts.embeddings import ModelMismatchError
+from scripts.chroma_router import StaleLayoutError
+from scripts.slack_source import SlackSource
+from scripts.gitlab_source import GitLabSource
+
+# Registered source plugins, in run order
+SOURCES = {
+    source.name: source
+    for source in (SlackSource(), GitLabSource())
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Index Slack and GitLab knowledge into Chroma (incremental by default)'
+    )
+    parser.add_argument(
+        '--source',
+        default='',
+        help=f"Comma-separated sources to run ({', '.join(SOURCES)}; default: all configured)"
+    )
+    parser.add_argument(
+        '--full-reindex',
+        action='store_true',
+        help='Force full reindexing from scratch (ignores previous state)'
+    )
+    parser.add_argument(
+        '--dedup-threshold',
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help=f'Similarity (0-1) above which documents are stored as duplicates (default: {DEDUP_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--no-dedup',
+        action='store_true',
+        default=not DEDUP_ENABLED,
+        help='Disable near-duplicate detection'
+    )
+    args = parser.parse_args(argv)
+
+    if not 0 < args.dedup_threshold <= 1:
+        parser.error('--dedup-threshold must be between 0 and 1')
+    return args
+
+
+def select_sources(requested):
+    """Resolve --source into configured source plugins
+
+    Explicitly requested sources must be configured; when running all
+    sources, unconfigured ones are skipped with a warning.
+    """
+    names = [n.strip() for n in requested.split(',') if n.strip()]
+    explicit = bool(names)
+
+    selected = []
+    for name in names or list(SOURCES):
+        source = SOURCES.get(name)
+        if not source:
+            print(f"❌ Unknown source '{name}' (available: {', '.join(SOURCES)})")
+            sys.exit(1)
+
+        error = source.check_config()
+        if error and explicit:
+            print(f"❌ {error}")
+            sys.exit(1)
+        if error:
+            print(f"⚠️  Skipping {name}: {error.splitlines()[0]}")
+            continue
+
+        selected.append(source)
+
+    if not selected:
+        print("❌ No configured sources to index")
+        sys.exit(1)
+
+    return selected
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.monotonic()
+
+    sources = select_sources(args.source)
+
+    # Initialize state
+    state = IndexerState()
+
+    # Handle full reindex (only reset the sections of the sources being rebuilt)
+    if args.full_reindex:
+        print("🔄 Full reindex requested - resetting state...")
+        for source in sources:
+            state.reset_source(source.name)
+        mode = "FULL reindex"
+    else:
+        mode = "incremental update"
+
+    ctx = IndexContext(
+        state,
+        full_reindex=args.full_reindex,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold
+    )
+
+    failed = []
+    try:
+        for source in sources:
+            print("=" * 60)
+            print(f"🔍 {source.title}")
+            print("=" * 60)
+            print(f"📅 Mode: {mode}")
+            print(f"📂 Chroma path: {CHROMA_PATH}")
+            print(f"🧬 Dedup: {'off' if args.no_dedup else f'similarity >= {args.dedup_threshold}'}")
+
+            # One failing source (network, API, model mismatch) must not block the others
+            try:
+                source.run(ctx)
+            except (ModelMismatchError, StaleLayoutError) as e:
+                print(f"\n❌ {e}")
+                failed.append(source.name)
+            except Exception as e:
+                print(f"\n❌ {source.title} failed: {type(e).__name__}: {e}")
+                traceback.print_exc()
+                failed.append(source.name)
+
+            # Save after each source so a later failure keeps earlier progress
+            state.save()
+            print()
+
+        print("=" * 60)
+        print("⚠️  Indexing finished with errors" if failed else "✅ Indexing complete!")
+        for name, counts in ctx.summary.items():
+            details = ', '.join(f"{key} {value}" for key, value in counts.items())
+            print(f"   {name}: {details}")
+        for name, counts in ctx.dedup_stats().items():
+            print(f"   🧬 {name}: {counts['canonical']} unique, {counts['duplicates']} stored as duplicates")
+    finally:
+        # Releases the dedup connection and the Chroma lock even if a run aborts
+        ctx.close()
+
+    if failed:
+        print(f"   ❌ Failed: {', '.join(failed)}")
+    print(f"   ⏱️  {time.monotonic() - started:.2f}s")
+    print("=" * 60)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
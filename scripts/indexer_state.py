@@ -57,6 +57,10 @@ class IndexerState:
         if self.state_file.exists():
             self.state_file.unlink()
 
+    def reset_source(self, source: str):
+        """Reset state for a single source (for full reindex of that source)"""
+        self.state[source] = self._default_state()[source]
+
     # Slack state management
 
     def get_slack_channel_timestamp(self, channel_name: str) -> Optional[str]:
@@ -77,6 +81,22 @@ class IndexerState:
             "last_run": datetime.now().isoformat()
         }
 
+    def get_slack_last_prune(self) -> Optional[float]:
+        """Get Unix time of the last retention prune"""
+        return self.state.get("slack", {}).get("last_prune")
+
+    def update_slack_last_prune(self, pruned_at: float):
+        """Record Unix time of the last retention prune"""
+        self.state.setdefault("slack", {"channels": {}})["last_prune"] = pruned_at
+
+    def is_slack_epoch_backfilled(self) -> bool:
+        """Whether existing Slack documents have the numeric epoch field"""
+        return self.state.get("slack", {}).get("epoch_backfilled", False)
+
+    def mark_slack_epoch_backfilled(self):
+        """Record that existing Slack documents have the numeric epoch field"""
+        self.state.setdefault("slack", {"channels": {}})["epoch_backfilled"] = True
+
     # GitLab state management
 
     def get_gitlab_repo_state(self, repo_path: str) -> Optional[Dict[str, Any]]:
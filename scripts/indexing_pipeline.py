@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+Shared indexing pipeline for all knowledge sources
+Sources produce documents which flow through: filter → chunk → dedup → embed → upsert
+
+Heavy dependencies (chromadb and the embedding model) are imported lazily,
+only once a pipeline actually has documents to index, so incremental runs
+with nothing new never pay their startup cost.
+"""
+
+import os
+import sys
+import fcntl
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List, Iterable, Callable, Tuple
+
+from scripts.indexer_state import IndexerState
+from scripts.staged_pipeline import StagedPipeline, Stage, QUEUE_SIZE
+
+CHROMA_PATH = os.path.expanduser(os.getenv('CHROMA_DATA_DIR', '~/claude-code-data/chroma'))
+BATCH_SIZE = int(os.getenv('INDEX_BATCH_SIZE', '64'))
+
+
+def import_chromadb():
+    """Import chromadb on first use"""
+    try:
+        import chromadb
+    except ImportError:
+        print("❌ chromadb not installed. Run: pip install 'chromadb>=1.0,<2'")
+        sys.exit(1)
+    return chromadb
+
+
+class ChromaLock:
+    """Advisory lock file next to the Chroma directory
+
+    Indexer runs hold it shared while they use the Chroma client. Collection
+    migrations hold it exclusively while they catch up and swap collections,
+    so no indexer recreates a live collection in the middle of a swap.
+    """
+
+    def __init__(self, chroma_path: str = CHROMA_PATH):
+        self.path = f"{os.path.normpath(chroma_path)}.lock"
+        self._file = None
+
+    def acquire(self, exclusive: bool = False, waiting: str = "another process"):
+        """Take the lock, waiting (with a notice) while it is held in a conflicting mode"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a')
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(self._file, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"\n⏳ Waiting for {waiting} ({self.path})...", flush=True)
+            fcntl.flock(self._file, mode)
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def new_stats() -> Dict[str, Any]:
+    """Empty pipeline counters"""
+    return {'indexed': 0, 'skipped': 0, 'duplicates': 0, 'restored': 0, 'ids': []}
+
+
+def merge_stats(total: Dict[str, Any], part: Dict[str, Any]):
+    """Add one batch's counters to the running totals"""
+    for key in ('indexed', 'skipped', 'duplicates', 'restored'):
+        total[key] += part[key]
+    total['ids'].extend(part['ids'])
+
+
+class IndexContext:
+    """Per-run state shared by all sources (state file, Chroma client, routers, stats)"""
+
+    def __init__(
+        self,
+        state: IndexerState,
+        full_reindex: bool = False,
+        chroma_path: str = CHROMA_PATH,
+        dedup_threshold: Optional[float] = None
+    ):
+        self.state = state
+        self.full_reindex = full_reindex
+        self.chroma_path = chroma_path
+        self.dedup_threshold = dedup_threshold
+        self.summary = {}
+        self._client = None
+        self._chroma_lock = None
+        self._routers = {}
+        self._dedup = None
+        self._dedup_ready = set()
+        # Stage worker threads may race to initialise lazy resources
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        """Chroma client, created on first access"""
+        with self._lock:
+            if self._client is None:
+                chromadb = import_chromadb()
+                # Held until close() so migrations never swap collections under this run
+                self._chroma_lock = ChromaLock(self.chroma_path)
+                self._chroma_lock.acquire(waiting="a collection migration to finish swapping")
+                self._client = chromadb.PersistentClient(path=self.chroma_path)
+            return self._client
+
+    @property
+    def dedup(self):
+        """Near-duplicate index, opened on first access (None when dedup is disabled)"""
+        if self.dedup_threshold is None:
+            return None
+        with self._lock:
+            if self._dedup is None:
+                from scripts.dedup import DedupIndex
+                self._dedup = DedupIndex(threshold=self.dedup_threshold)
+            return self._dedup
+
+    def prepare_dedup(self, router):
+        """Make the dedup index reflect a collection before its first batch this run
+
+        Documents indexed before dedup was enabled are backfilled once; a full
+        reindex rebuilds the collection's dedup data from scratch.
+        """
+        collection_name = router.base_name
+        with self._lock:
+            if collection_name in self._dedup_ready:
+                return
+            self._dedup_ready.add(collection_name)
+
+            with self.dedup.lock:
+                if self.full_reindex:
+                    self.dedup.reset(collection_name)
+                if not self.dedup.is_backfilled(collection_name):
+                    shards = [self.client.get_collection(name=name, embedding_function=None) for name in router.shards()]
+                    added = self.dedup.backfill(collection_name, shards)
+                    if added:
+                        print(f"\n  🧬 Registered {added} existing documents for near-duplicate detection")
+
+    def dedup_stats(self) -> Dict[str, Dict[str, int]]:
+        """Canonical/duplicate totals for collections deduplicated this run"""
+        return {name: self.dedup.stats(name) for name in sorted(self._dedup_ready)}
+
+    def close(self):
+        """Release resources opened during the run"""
+        if self._dedup is not None:
+            self._dedup.close()
+        if self._chroma_lock is not None:
+            self._chroma_lock.release()
+
+    def get_router(self, collection_name: str, partition: str = 'none', metadata: Optional[Dict[str, Any]] = None):
+        """Get (cached) collection router for a logical collection
+
+        A full reindex deletes shards left over from another partition mode;
+        otherwise their presence is an error.
+
+        Raises:
+            ModelMismatchError: Existing shards were embedded with another model
+            StaleLayoutError: Shards from another partition mode exist
+        """
+        with self._lock:
+            if collection_name not in self._routers:
+                from scripts.chroma_router import CollectionRouter
+                router = CollectionRouter(
+                    self.client,
+                    collection_name,
+                    partition=partition,
+                    metadata=metadata
+                )
+                if self.full_reindex:
+                    dropped = router.drop_stale_shards()
+                    if dropped:
+                        print(f"\n  🗑️  Removed {len(dropped)} collections from a previous partition mode: {', '.join(dropped)}")
+                else:
+                    router.check_layout()
+                router.check_models()
+                self._routers[collection_name] = router
+            return self._routers[collection_name]
+
+    def record(self, source: str, **counts: int):
+        """Add counts to the run summary for a source"""
+        totals = self.summary.setdefault(source, {})
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+
+
+class IndexPipeline:
+    """Runs documents through filter → chunk → dedup → embed → upsert for one collection
+
+    Documents are dicts with `id`, `text` and `metadata` keys. They are
+    processed in batches; the collection and embedding model are only
+    touched once the first batch arrives.
+    """
+
+    def __init__(
+        self,
+        ctx: IndexContext,
+        collection_name: str,
+        partition: str = 'none',
+        metadata: Optional[Dict[str, Any]] = None,
+        batch_size: int = BATCH_SIZE,
+        dedup: bool = False
+    ):
+        self.ctx = ctx
+        self.collection_name = collection_name
+        self.partition = partition
+        self.metadata = metadata
+        self.batch_size = batch_size
+        self.use_dedup = dedup
+        # Duplicates whose canonical document was removed or changed, to index again
+        self._orphans = []
+        self._orphans_lock = threading.Lock()
+
+    @property
+    def router(self):
+        return self.ctx.get_router(self.collection_name, self.partition, self.metadata)
+
+    @property
+    def dedup(self):
+        # Near-duplicate detection only runs when enabled for the run as well
+        return self.ctx.dedup if self.use_dedup else None
+
+    def run(self, documents: Iterable[Dict[str, Any]], skip_existing: bool = True) -> Dict[str, Any]:
+        """Index documents
+
+        Args:
+            documents: Iterable of {'id', 'text', 'metadata'} dicts
+            skip_existing: Skip documents whose ID is already in the collection
+
+        Returns:
+            dict: Counts (`indexed`, `skipped`, `duplicates`, `restored` orphans)
+            and `ids` of documents now present (embedded or stored as a duplicate
+            reference)
+        """
+        stats = new_stats()
+        self._run_documents(documents, skip_existing, stats)
+        self._restore_orphans(stats)
+        return stats
+
+    def restore(self, orphans: List[Dict[str, Any]]) -> int:
+        """Index duplicates orphaned by DedupIndex.forget (their canonical document was removed)
+
+        Returns:
+            int: Number of documents indexed again (embedded or re-attached as duplicates)
+        """
+        with self._orphans_lock:
+            self._orphans.extend(orphans)
+        stats = new_stats()
+        self._restore_orphans(stats)
+        return stats['restored']
+
+    def _run_documents(self, documents: Iterable[Dict[str, Any]], skip_existing: bool, stats: Dict[str, Any]):
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                self._run_batch(batch, skip_existing, stats)
+                batch = []
+        if batch:
+            self._run_batch(batch, skip_existing, stats)
+
+    def _restore_orphans(self, stats: Dict[str, Any]):
+        """Index orphaned duplicates until none are left
+
+        Orphans go through dedup again, so they re-attach to another copy when
+        one is still indexed and are embedded otherwise. Restoring can orphan
+        further documents (when an embedding batch fails), hence the loop.
+        """
+        while True:
+            with self._orphans_lock:
+                orphans, self._orphans = self._orphans, []
+            if not orphans:
+                return
+
+            docs = [orphan for orphan in orphans if orphan['text'] is not None]
+            if len(docs) < len(orphans):
+                print(
+                    f"\n⚠️  {len(orphans) - len(docs)} duplicates of removed documents were recorded "
+                    f"without their content; run with --full-reindex to restore them"
+                )
+
+            restored = new_stats()
+            self._run_documents(docs, False, restored)
+            stats['restored'] += restored['indexed'] + restored['duplicates']
+            stats['skipped'] += restored['skipped']
+
+    def _add_orphans(self, orphans: List[Dict[str, Any]]):
+        if orphans:
+            with self._orphans_lock:
+                self._orphans.extend(orphans)
+
+    def run_staged(
+        self,
+        items: Iterable[Any],
+        read: Callable[[Any], Optional[Dict[str, Any]]],
+        skip_existing: bool = True,
+        workers: Optional[Dict[str, int]] = None,
+        queue_size: int = QUEUE_SIZE
+    ) -> Dict[str, Any]:
+        """Index documents through concurrent read → chunk → embed → write stages
+
+        Args:
+            items: Inputs for `read` (e.g. file paths), consumed lazily
+            read: Turns one item into a document, or None to drop it
+            skip_existing: Skip documents whose ID is already in the collection
+            workers: Worker threads per stage (`read`, `chunk`, `embed`, `write`)
+            queue_size: Documents buffered per queue between stages; the
+                embed and write queues hold batches, so they get
+                `queue_size // batch_size` slots
+
+        Returns:
+            dict: Same as run(), plus `pipeline` with queue depth and stage stats
+        """
+        workers = workers or {}
+        stats = new_stats()
+        stats_lock = threading.Lock()
+
+        def merge(local):
+            with stats_lock:
+                merge_stats(stats, local)
+
+        def read_stage(item):
+            doc = read(item)
+            return [doc] if doc else []
+
+        def chunk_stage(batch):
+            local = new_stats()
+            groups = self._prepare(batch, skip_existing, local)
+            merge(local)
+            return groups
+
+        def embed_stage(group):
+            collection, docs = group
+            try:
+                return [(collection, docs, self.embed([doc['text'] for doc in docs]))]
+            except Exception as e:
+                local = new_stats()
+                self._failed(docs, e, local)
+                merge(local)
+                return []
+
+        def write_stage(item):
+            local = new_stats()
+            self._write(*item, local)
+            merge(local)
+            return []
+
+        def on_error(stage, item, error):
+            print(f"\n⚠️  {stage.name} stage failed: {error}")
+            with stats_lock:
+                stats['skipped'] += len(item) if isinstance(item, list) else 1
+
+        def checked(items):
+            for index, item in enumerate(items):
+                if index == 0:
+                    # Resolve the router in this thread so a model mismatch aborts the run
+                    self.router
+                yield item
+
+        # After chunking each item is a batch of up to batch_size documents
+        batch_queue_size = max(1, queue_size // self.batch_size)
+
+        pipeline = StagedPipeline([
+            Stage('read', read_stage, workers.get('read', 1)),
+            Stage('chunk', chunk_stage, workers.get('chunk', 1), batch_size=self.batch_size),
+            Stage('embed', embed_stage, workers.get('embed', 1), queue_size=batch_queue_size),
+            Stage('write', write_stage, workers.get('write', 1), queue_size=batch_queue_size),
+        ], queue_size=queue_size, on_error=on_error)
+
+        stats['pipeline'] = pipeline.run(checked(items))
+        self._restore_orphans(stats)
+        if self.dedup:
+            with self.dedup.lock:
+                self.dedup.commit()
+        return stats
+
+    def _run_batch(self, batch: List[Dict[str, Any]], skip_existing: bool, stats: Dict[str, Any]):
+        """Process one batch through all stages"""
+        for collection, docs in self._prepare(batch, skip_existing, stats):
+            try:
+                embeddings = self.embed([doc['text'] for doc in docs])
+            except Exception as e:
+                self._failed(docs, e, stats)
+                continue
+            self._write(collection, docs, embeddings, stats)
+
+        if self.dedup:
+            self.dedup.commit()
+
+    def _prepare(self, batch: List[Dict[str, Any]], skip_existing: bool, stats: Dict[str, Any]) -> List[Tuple[Any, List[Dict[str, Any]]]]:
+        """Filter, chunk and dedup a batch, grouped by shard collection
+
+        Returns:
+            list: (collection, documents to embed) per shard
+        """
+        if self.dedup:
+            self.ctx.prepare_dedup(self.router)
+
+        groups = {}
+        for doc in batch:
+            name = self.router.shard_name(doc['metadata'])
+            if name not in groups:
+                groups[name] = (self.router.collection_for(doc['metadata']), [])
+            groups[name][1].append(doc)
+
+        prepared = []
+        for collection, docs in groups.values():
+            docs = self.filter_existing(collection, docs, skip_existing, stats)
+            docs = [chunk for doc in docs for chunk in self.chunk(doc)]
+            if self.dedup:
+                with self.dedup.lock:
+                    docs = self.deduplicate(collection, docs, skip_existing, stats)
+            if docs:
+                prepared.append((collection, docs))
+        return prepared
+
+    def _write(self, collection, docs: List[Dict[str, Any]], embeddings: List[List[float]], stats: Dict[str, Any]):
+        try:
+            self.upsert(collection, docs, embeddings)
+        except Exception as e:
+            self._failed(docs, e, stats)
+            return
+        stats['indexed'] += len(docs)
+        stats['ids'].extend(doc['id'] for doc in docs)
+
+    def _failed(self, docs: List[Dict[str, Any]], error: Exception, stats: Dict[str, Any]):
+        print(f"\n⚠️  Failed to index batch of {len(docs)} documents: {error}")
+        stats['skipped'] += len(docs)
+        if self.dedup:
+            # Not embedded, so they cannot serve as canonical documents
+            with self.dedup.lock:
+                self._add_orphans(self.dedup.forget(self.collection_name, [doc['id'] for doc in docs]))
+
+    # Stages
+
+    def filter_existing(self, collection, docs: List[Dict[str, Any]], skip_existing: bool, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Drop documents already in the collection (one lookup per batch)
+
+        With skip_existing=False only documents whose `content_hash` metadata
+        matches the stored one are dropped, so unchanged content is never
+        re-embedded. A full reindex always re-embeds.
+        """
+        check_hash = not self.ctx.full_reindex and any('content_hash' in doc['metadata'] for doc in docs)
+        if not skip_existing and not check_hash:
+            return docs
+
+        ids = [doc['id'] for doc in docs]
+        try:
+            result = collection.get(ids=ids, include=['metadatas'] if check_hash else [])
+            stored = dict(zip(result['ids'], result.get('metadatas') or [{}] * len(result['ids'])))
+        except Exception:
+            stored = {}
+
+        existing = set()
+        for doc in docs:
+            if doc['id'] not in stored:
+                continue
+            content_hash = doc['metadata'].get('content_hash')
+            if skip_existing or (content_hash and (stored[doc['id']] or {}).get('content_hash') == content_hash):
+                existing.add(doc['id'])
+
+        if self.dedup and skip_existing:
+            with self.dedup.lock:
+                existing |= self.dedup.duplicate_ids(self.collection_name, ids)
+
+        remaining = []
+        for doc in docs:
+            if doc['id'] in existing:
+                stats['skipped'] += 1
+                stats['ids'].append(doc['id'])
+            else:
+                remaining.append(doc)
+        return remaining
+
+    def chunk(self, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split a document into indexable chunks (documents are indexed whole)"""
+        return [doc]
+
+    def deduplicate(self, collection, docs: List[Dict[str, Any]], skip_existing: bool, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Replace near-duplicates of indexed documents with references to them
+
+        Unique documents are registered immediately, so later documents in the
+        same batch are checked against them too. Duplicates of documents whose
+        content changed are queued to be indexed again.
+        """
+        remaining = []
+        replaced = []
+        for doc in docs:
+            signature = self.dedup.signature(doc['text'])
+            if signature is None:
+                remaining.append(doc)
+                continue
+
+            match = self.dedup.find_duplicate(self.collection_name, doc['id'], signature)
+            if match:
+                canonical_id, similarity = match
+                self._add_orphans(self.dedup.add_duplicate(
+                    self.collection_name,
+                    doc['id'],
+                    canonical_id,
+                    similarity,
+                    document=doc['text'],
+                    metadata=doc['metadata']
+                ))
+                stats['duplicates'] += 1
+                stats['ids'].append(doc['id'])
+                replaced.append(doc['id'])
+            else:
+                self._add_orphans(self.dedup.add(self.collection_name, doc['id'], signature))
+                remaining.append(doc)
+
+        # Re-indexed documents that became duplicates drop their old embedding
+        if replaced and not skip_existing:
+            collection.delete(ids=replaced)
+
+        return remaining
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the collection's configured model"""
+        return self.router.embedding_model(texts)
+
+    def upsert(self, collection, docs: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """Write documents and their embeddings to the collection"""
+        collection.upsert(
+            ids=[doc['id'] for doc in docs],
+            documents=[doc['text'] for doc in docs],
+            metadatas=[doc['metadata'] for doc in docs],
+            embeddings=embeddings
+        )
+
+
+class IndexSource(ABC):
+    """Base class for indexing source plugins"""
+
+    name = ''
+    title = ''
+
+    def check_config(self) -> Optional[str]:
+        """Return an error message if the source is not configured, else None"""
+        return None
+
+    @abstractmethod
+    def run(self, ctx: IndexContext):
+        """Fetch new content and index it through IndexPipeline"""
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Rebuild a collection with its configured embedding model and HNSW settings
+Run: source .venv/bin/activate && python scripts/migrate-collection.py slack_knowledge
+     python scripts/migrate-collection.py codebase_knowledge --background
+
+Change the `embedding` (or `hnsw`) section of collections.json first; the
+indexer refuses to write to a collection embedded with another model until it
+has been migrated.
+
+Every shard is re-embedded from its stored documents into a staging
+collection next to the live one, which keeps serving queries meanwhile.
+Documents added, changed or removed during the copy are caught up, then the
+staging collection takes over the live name; indexer runs wait on the Chroma
+lock file meanwhile. When only HNSW settings changed, the
+stored embeddings are reused instead of re-embedding.
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.indexing_pipeline import import_chromadb, ChromaLock, CHROMA_PATH
+from scripts.chroma_router import CollectionRouter, list_collection_names, partition_for, fit_collection_name
+from scripts.collection_config import hnsw_metadata, hnsw_mismatches
+from scripts.embeddings import model_identity, collection_identity, describe_identity, chroma_embedding_function
+
+PAGE_SIZE = 500
+LOG_DIR = Path(__file__).parent.parent / 'logs'
+
+# Staging/backup names don't start with the base name, so routers never see them as shards
+STAGING_PREFIX = 'next_'
+BACKUP_PREFIX = 'prev_'
+
+
+def prefixed_name(prefix, name):
+    """Build a valid collection name for a staging or backup copy of `name`"""
+    return fit_collection_name(f"{prefix}{name}", name)
+
+
+def delete_if_exists(client, name):
+    if name in list_collection_names(client):
+        client.delete_collection(name=name)
+
+
+def fingerprints(collection, page_size=PAGE_SIZE):
+    """Map every document ID in a collection to a hash of its text and metadata"""
+    result = {}
+    offset = 0
+    while True:
+        page = collection.get(include=['documents', 'metadatas'], limit=page_size, offset=offset)
+        if not page['ids']:
+            return result
+        for doc_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+            content = json.dumps([document, metadata], sort_keys=True, default=str)
+            result[doc_id] = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        offset += len(page['ids'])
+
+
+def copy_page(target, page, model):
+    """Write one page of documents to the target, re-embedding unless `model` is None"""
+    if model is None:
+        embeddings = page['embeddings']
+    else:
+        embeddings = model(page['documents'])
+
+    target.upsert(
+        ids=page['ids'],
+        documents=page['documents'],
+        metadatas=page['metadatas'],
+        embeddings=embeddings
+    )
+
+
+def migrate_shard(client, router, source, keep_old=False, page_size=PAGE_SIZE):
+    """Rebuild one shard into a staging collection and swap it in
+
+    Returns:
+        int: Number of documents in the rebuilt shard
+    """
+    name = source.name
+    staging_name = prefixed_name(STAGING_PREFIX, name)
+    backup_name = prefixed_name(BACKUP_PREFIX, name)
+
+    # Leftover from an interrupted migration
+    delete_if_exists(client, staging_name)
+
+    metadata = {
+        key: value for key, value in (source.metadata or {}).items()
+        if not key.startswith(('hnsw:', 'embedding:'))
+    }
+    metadata.update(hnsw_metadata(router.hnsw))
+    metadata.update(model_identity(router.embedding))
+    target = client.create_collection(
+        name=staging_name,
+        metadata=metadata,
+        embedding_function=chroma_embedding_function(router.embedding)
+    )
+
+    # Same model: only the index is rebuilt, vectors are copied as-is
+    reuse = collection_identity(source) == model_identity(router.embedding)
+    model = None if reuse else router.embedding_model
+    include = ['documents', 'metadatas', 'embeddings'] if reuse else ['documents', 'metadatas']
+
+    total = source.count()
+    copied = 0
+    while True:
+        page = source.get(include=include, limit=page_size, offset=copied)
+        if not len(page['ids']):
+            break
+        copy_page(target, page, model)
+        copied += len(page['ids'])
+        print(f"\r  🔁 {name}: {copied}/{total} documents", end='', flush=True)
+
+    # Indexers wait while the live name briefly points at nothing during the swap
+    lock = ChromaLock(CHROMA_PATH)
+    lock.acquire(exclusive=True, waiting="running indexers to finish")
+    try:
+        # Catch up with documents the indexer added, changed or removed during the copy
+        source_hashes = fingerprints(source, page_size)
+        target_hashes = fingerprints(target, page_size)
+        stale = sorted(doc_id for doc_id, digest in source_hashes.items() if target_hashes.get(doc_id) != digest)
+        for start in range(0, len(stale), page_size):
+            copy_page(target, source.get(ids=stale[start:start + page_size], include=include), model)
+        extra = sorted(set(target_hashes) - set(source_hashes))
+        if extra:
+            target.delete(ids=extra)
+
+        count = target.count()
+        if count != len(source_hashes):
+            raise RuntimeError(f"{staging_name} has {count} documents, expected {len(source_hashes)}; live collection kept")
+
+        # Swap: the live name points at the old collection until the last rename
+        delete_if_exists(client, backup_name)
+        source.modify(name=backup_name)
+        target.modify(name=name)
+    finally:
+        lock.release()
+
+    if not keep_old:
+        client.delete_collection(name=backup_name)
+
+    print(f"\r  ✅ {name}: {count} documents{' (previous kept as ' + backup_name + ')' if keep_old else ''}")
+    return count
+
+
+def migrate_collection(collection_name, force=False, keep_old=False):
+    """Rebuild every shard of a collection that differs from its configured settings"""
+    chromadb = import_chromadb()
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+
+    router = CollectionRouter(client, collection_name, partition=partition_for(collection_name))
+
+    shards = router.shards()
+    if not shards:
+        raise RuntimeError(f"Collection {collection_name} does not exist")
+
+    configured = model_identity(router.embedding)
+    print(f"🧠 Model: {describe_identity(configured)}, max {router.embedding['max_tokens']} tokens")
+    if router.hnsw:
+        print(f"🕸️  HNSW: {', '.join(f'{k}={v}' for k, v in router.hnsw.items())}")
+    print()
+
+    migrated = 0
+    for name in shards:
+        source = client.get_collection(name=name)
+        identity = collection_identity(source)
+        mismatches = hnsw_mismatches(source, router.hnsw)
+
+        if identity == configured and not mismatches and not force:
+            print(f"  ⏭️  {name}: up to date")
+            continue
+
+        changes = []
+        if identity != configured:
+            changes.append(f"{describe_identity(identity)} → {describe_identity(configured)}")
+        changes.extend(mismatches)
+        if changes:
+            print(f"  📝 {name}: {'; '.join(changes)}")
+
+        migrate_shard(client, router, source, keep_old=keep_old)
+        migrated += 1
+
+    return migrated
+
+
+def run_in_background(collection_name):
+    """Re-run this command detached from the terminal, logging to logs/"""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = LOG_DIR / f"migrate-{collection_name}.log"
+    argv = [arg for arg in sys.argv[1:] if arg != '--background']
+
+    with open(log_path, 'a') as log:
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve())] + argv,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+    print(f"🚀 Migrating {collection_name} in the background (PID {process.pid})")
+    print(f"   Log: {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild a collection with its configured embedding model and HNSW settings'
+    )
+    parser.add_argument('collection', help='Collection to migrate (e.g. slack_knowledge, codebase_knowledge)')
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild shards that already match the configured settings'
+    )
+    parser.add_argument(
+        '--keep-old',
+        action='store_true',
+        help=f'Keep the previous collections as {BACKUP_PREFIX}<name> instead of deleting them'
+    )
+    parser.add_argument(
+        '--background',
+        action='store_true',
+        help='Run detached and log to logs/migrate-<collection>.log'
+    )
+    args = parser.parse_args()
+
+    if args.background:
+        run_in_background(args.collection)
+        return
+
+    print("=" * 60)
+    print(f"🔁 Collection Migration: {args.collection}")
+    print("=" * 60)
+    print(f"📂 Chroma path: {CHROMA_PATH}")
+
+    try:
+        migrated = migrate_collection(args.collection, force=args.force, keep_old=args.keep_old)
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+    print()
+    print("=" * 60)
+    print(f"✅ {migrated} shards migrated")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Query the Chroma knowledge base from the command line
+Run: source .venv/bin/activate && python scripts/query-knowledge.py "checkout observer" --where type=code
+     python scripts/query-knowledge.py "deploy issue" --collection slack_knowledge --days 30
+
+Partitioned collections (CHROMA_PARTITION=type|repo) are queried through the
+collection router, which fans out to the matching shards and merges results.
+Near-duplicates stored as references are listed under their canonical document,
+or on their own when only they match the filter.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import chromadb
+except ImportError:
+    print("❌ chromadb not installed. Run: pip install 'chromadb>=1.0,<2'")
+    sys.exit(1)
+
+from scripts.chroma_router import CollectionRouter, partition_for, metadata_matches
+from scripts.dedup import DedupIndex
+from scripts.slack_source import EPOCH_FIELD
+
+CHROMA_PATH = os.path.expanduser(os.getenv('CHROMA_DATA_DIR', '~/claude-code-data/chroma'))
+
+
+def parse_where(conditions, days=None):
+    """Build a Chroma metadata filter from key=value pairs and an optional time window"""
+    clauses = []
+    for condition in conditions:
+        if '=' not in condition:
+            print(f"❌ Invalid filter '{condition}' (expected key=value)")
+            sys.exit(1)
+        key, value = condition.split('=', 1)
+        clauses.append({key.strip(): value.strip()})
+
+    if days:
+        clauses.append({EPOCH_FIELD: {'$gte': int(time.time() - days * 86400)}})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {'$and': clauses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the Chroma knowledge base')
+    parser.add_argument('query', help='Search text')
+    parser.add_argument(
+        '--collection',
+        default='codebase_knowledge',
+        help='Collection to query (default: codebase_knowledge)'
+    )
+    parser.add_argument(
+        '--where',
+        action='append',
+        default=[],
+        metavar='KEY=VALUE',
+        help='Metadata filter, repeatable (e.g. --where type=code --where language=php)'
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        help=f'Only return documents from the last N days (filters on {EPOCH_FIELD}, Slack only)'
+    )
+    parser.add_argument('-n', '--limit', type=int, default=5, help='Number of results (default: 5)')
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+    router = CollectionRouter(client, args.collection, partition=partition_for(args.collection))
+
+    stale = router.stale_shards()
+    if stale:
+        print(f"⚠️  Ignoring {len(stale)} collections from another partition mode; run index.py --full-reindex")
+
+    where = parse_where(args.where, days=args.days)
+    results = router.query(
+        query_texts=[args.query],
+        n_results=args.limit,
+        where=where
+    )
+    hits = list(zip(
+        results['distances'][0],
+        results['ids'][0],
+        results['documents'][0],
+        results['metadatas'][0],
+        [None] * len(results['ids'][0])
+    ))
+
+    # Near-duplicates are not embedded; list them under their canonical document
+    dedup = DedupIndex()
+
+    # A filter can match a duplicate whose canonical document it excludes (another
+    # repo or channel, or a shard the filter skips): rank it by its canonical's distance
+    if where:
+        references = {}
+        for reference in dedup.duplicate_references(args.collection):
+            if reference['metadata'] is not None and metadata_matches(reference['metadata'], where):
+                references.setdefault(reference['canonical_id'], []).append(reference)
+        if references:
+            canonicals = router.query(
+                query_texts=[args.query],
+                n_results=args.limit,
+                ids=list(references)
+            )
+            for distance, canonical_id in zip(canonicals['distances'][0], canonicals['ids'][0]):
+                for reference in references[canonical_id]:
+                    hits.append((distance, reference['id'], reference['text'] or '', reference['metadata'], canonical_id))
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:args.limit]
+
+    if not hits:
+        print("ℹ️  No results")
+        dedup.close()
+        return
+
+    listed = {hit[1] for hit in hits}
+    for rank, (distance, doc_id, document, metadata, canonical_id) in enumerate(hits, start=1):
+        print(f"{rank}. {doc_id} (distance {distance:.4f})")
+        details = ', '.join(f"{k}={v}" for k, v in metadata.items())
+        print(f"   {details}")
+        snippet = ' '.join(document.split())[:200]
+        print(f"   {snippet}")
+        if canonical_id:
+            print(f"   ↳ duplicate of: {canonical_id}")
+        else:
+            duplicates = [d for d in dedup.duplicates_of(args.collection, doc_id) if d not in listed]
+            if duplicates:
+                print(f"   ↳ also in: {', '.join(duplicates)}")
+        print()
+
+    dedup.close()
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,8 @@ VENV_PYTHON="$PROJECT_DIR/.venv/bin/python"
 # Create cron entries
 CRON_ENTRIES=$(cat <<CRONEOF
 # 9Yards Agent Knowledge Indexing
-# Slack indexing - nightly at 2 AM
-0 2 * * * cd $PROJECT_DIR && $VENV_PYTHON scripts/index-slack-knowledge.py >> logs/slack-index.log 2>&1
-
-# GitLab indexing - weekly on Sunday at 3 AM
-0 3 * * 0 cd $PROJECT_DIR && $VENV_PYTHON scripts/index-gitlab-repos.py >> logs/gitlab-index.log 2>&1
+# Slack + GitLab indexing (incremental, single process) - nightly at 2 AM
+0 2 * * * cd $PROJECT_DIR && $VENV_PYTHON scripts/index.py >> logs/index.log 2>&1
 CRONEOF
 )
 
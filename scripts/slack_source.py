@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Slack source for the unified indexer
+Fetches channel messages and indexes them into the slack_knowledge collection
+
+Supports incremental updates by default (only indexes new messages since last run).
+"""
+
+import os
+import time
+import requests
+from datetime import datetime, timedelta
+
+from scripts.indexing_pipeline import IndexSource, IndexPipeline
+
+# Configuration from environment
+SLACK_XOXC_TOKEN = os.getenv('SLACK_MCP_XOXC_TOKEN')
+SLACK_XOXD_TOKEN = os.getenv('SLACK_MCP_XOXD_TOKEN')
+CHANNELS_ENV = os.getenv('SLACK_CHANNELS', '')
+CHANNELS = [c.strip() for c in CHANNELS_ENV.split(',') if c.strip()] if CHANNELS_ENV else []
+DAYS_BACK = int(os.getenv('SLACK_DAYS_BACK', '90'))
+# Messages older than this are pruned from the index (0 = keep forever)
+RETENTION_DAYS = int(os.getenv('SLACK_RETENTION_DAYS', str(DAYS_BACK)))
+PRUNE_INTERVAL = 24 * 3600
+
+COLLECTION_NAME = "slack_knowledge"
+COLLECTION_METADATA = {"description": "Indexed Slack messages for knowledge retrieval"}
+
+# Numeric message time (Unix seconds) for range filters like "last 30 days"
+EPOCH_FIELD = 'ts_epoch'
+
+
+def get_slack_headers():
+    """Get headers for Slack API requests with session tokens"""
+    return {
+        'Authorization': f'Bearer {SLACK_XOXC_TOKEN}',
+        'Cookie': f'd={SLACK_XOXD_TOKEN};'
+    }
+
+def get_channel_ids():
+    """Get name → ID mapping for all accessible (non-archived) channels"""
+    resp = requests.get(
+        'https://slack.com/api/conversations.list',
+        headers=get_slack_headers(),
+        params={'types': 'public_channel,private_channel', 'limit': 1000}
+    )
+
+    if not resp.ok or not resp.json().get('ok'):
+        print(f"❌ Failed to list channels: {resp.json().get('error')}")
+        return {}
+
+    channels = resp.json()['channels']
+    # Filter out archived channels and bot-only channels
+    return {ch['name']: ch['id'] for ch in channels if not ch.get('is_archived', False)}
+
+def fetch_messages(channel_id, channel_name, oldest_timestamp=None, days_back=90):
+    """Fetch messages from channel
+
+    Args:
+        channel_id: Slack channel ID
+        channel_name: Channel name (for display)
+        oldest_timestamp: Unix timestamp to fetch from (for incremental), or None for days_back
+        days_back: Fallback days to go back if no timestamp provided
+    """
+    if oldest_timestamp:
+        oldest = float(oldest_timestamp)
+        print(f"  📥 Fetching new messages from #{channel_name} (since {datetime.fromtimestamp(oldest).strftime('%Y-%m-%d %H:%M')})...", end='', flush=True)
+    else:
+        oldest = (datetime.now() - timedelta(days=days_back)).timestamp()
+        print(f"  📥 Fetching messages from #{channel_name} (last {days_back} days)...", end='', flush=True)
+
+    messages = []
+    cursor = None
+
+    while True:
+        params = {
+            'channel': channel_id,
+            'oldest': oldest,
+            'limit': 200
+        }
+        if cursor:
+            params['cursor'] = cursor
+
+        resp = requests.get(
+            'https://slack.com/api/conversations.history',
+            headers=get_slack_headers(),
+            params=params
+        )
+        data = resp.json()
+
+        if not data.get('ok'):
+            print(f"\n❌ Error: {data.get('error')}")
+            break
+
+        messages.extend(data.get('messages', []))
+
+        if not data.get('has_more'):
+            break
+        cursor = data['response_metadata']['next_cursor']
+
+    print(f" {len(messages)} messages")
+    return messages
+
+def message_documents(messages, channel_name):
+    """Convert Slack messages into pipeline documents, skipping noise"""
+    for msg in messages:
+        # Skip bot messages, join/leave, simple reactions
+        if msg.get('subtype') or msg.get('bot_id'):
+            continue
+
+        text = msg.get('text', '')
+
+        # Skip very short messages (likely not useful)
+        if len(text) < 20:
+            continue
+
+        msg_ts = msg['ts']
+
+        # Add context if it's a thread reply
+        metadata = {
+            'source': 'slack',
+            'channel': channel_name,
+            'timestamp': msg_ts,
+            'user': msg.get('user', 'unknown'),
+            'thread': 'yes' if msg.get('thread_ts') else 'no',
+            'date': datetime.fromtimestamp(float(msg_ts)).isoformat(),
+            EPOCH_FIELD: int(float(msg_ts))
+        }
+
+        yield {
+            'id': f"slack_{channel_name}_{msg_ts}",
+            'text': text,
+            'metadata': metadata
+        }
+
+def index_to_chroma(ctx, messages, channel_name):
+    """Store messages in Chroma with metadata
+
+    Returns:
+        str: Latest fetched message timestamp (for state tracking), or None if no messages
+    """
+    pipeline = IndexPipeline(ctx, COLLECTION_NAME, metadata=COLLECTION_METADATA, dedup=True)
+    stats = pipeline.run(message_documents(messages, channel_name))
+
+    # Noise that never reaches the pipeline counts as skipped too
+    skipped = len(messages) - stats['indexed'] - stats['duplicates']
+    ctx.record('slack', indexed=stats['indexed'], skipped=skipped, duplicates=stats['duplicates'])
+    print(f"  ✅ Indexed {stats['indexed']} messages, skipped {skipped}, duplicates {stats['duplicates']}")
+
+    # Advance past every fetched message (including skipped ones) so they are not refetched
+    if not messages:
+        return None
+    return max((msg['ts'] for msg in messages), key=float)
+
+def backfill_epochs(collection, page_size=500):
+    """Add the numeric epoch field to messages indexed before it existed
+
+    Returns:
+        int: Number of messages updated
+    """
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+
+        ids = []
+        metadatas = []
+        for doc_id, metadata in zip(page['ids'], page['metadatas']):
+            metadata = metadata or {}
+            if EPOCH_FIELD in metadata or 'timestamp' not in metadata:
+                continue
+            ids.append(doc_id)
+            metadatas.append({**metadata, EPOCH_FIELD: int(float(metadata['timestamp']))})
+
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+        offset += len(page['ids'])
+
+    return updated
+
+def message_epoch(doc_id, metadata):
+    """Posting time of an indexed message (Unix seconds)"""
+    if metadata and EPOCH_FIELD in metadata:
+        return metadata[EPOCH_FIELD]
+    # IDs end in the Slack ts (references recorded before metadata was kept)
+    return int(float(doc_id.rsplit('_', 1)[-1]))
+
+def prune_expired(ctx, retention_days=RETENTION_DAYS):
+    """Delete messages older than the retention window
+
+    Every message is judged by its own timestamp, including messages stored
+    only as duplicate references. Duplicates that are still inside the window
+    but whose canonical message expired are indexed again before the
+    canonical message is deleted.
+
+    Runs at most once per PRUNE_INTERVAL so repeated no-op runs stay fast.
+    """
+    if retention_days <= 0:
+        return
+
+    last_prune = ctx.state.get_slack_last_prune()
+    if last_prune and time.time() - last_prune < PRUNE_INTERVAL:
+        return
+
+    pipeline = IndexPipeline(ctx, COLLECTION_NAME, metadata=COLLECTION_METADATA, dedup=True)
+    collection = pipeline.router.collection_for()
+
+    if not ctx.state.is_slack_epoch_backfilled():
+        updated = backfill_epochs(collection)
+        if updated:
+            print(f"  🕒 Added {EPOCH_FIELD} to {updated} existing messages")
+        ctx.state.mark_slack_epoch_backfilled()
+
+    cutoff = int(time.time() - retention_days * 86400)
+    expired = collection.get(where={EPOCH_FIELD: {'$lt': cutoff}}, include=[])['ids']
+
+    expired_duplicates = []
+    orphans = []
+    if ctx.dedup:
+        with ctx.dedup.lock:
+            expired_duplicates = [
+                doc['id'] for doc in ctx.dedup.duplicate_documents(COLLECTION_NAME)
+                if message_epoch(doc['id'], doc['metadata']) < cutoff
+            ]
+            # Expired references are dropped with their canonical; the rest come back as orphans
+            orphans = ctx.dedup.forget(COLLECTION_NAME, expired + expired_duplicates)
+
+    pruned = len(expired) + len(expired_duplicates)
+    restored = 0
+    if pruned:
+        print(f"🧹 Pruning {pruned} messages older than {retention_days} days...", end='', flush=True)
+        if orphans:
+            restored = pipeline.restore(orphans)
+        for start in range(0, len(expired), 500):
+            collection.delete(ids=expired[start:start + 500])
+        print(f" done{f', re-indexed {restored} newer copies' if restored else ''}")
+
+    ctx.record('slack', pruned=pruned)
+    if restored:
+        ctx.record('slack', restored=restored)
+    ctx.state.update_slack_last_prune(time.time())
+
+
+class SlackSource(IndexSource):
+    """Indexes Slack channel history into slack_knowledge"""
+
+    name = 'slack'
+    title = 'Slack Knowledge Indexing'
+
+    def check_config(self):
+        if not SLACK_XOXC_TOKEN or not SLACK_XOXD_TOKEN:
+            return (
+                "SLACK_MCP_XOXC_TOKEN and SLACK_MCP_XOXD_TOKEN not set in environment\n"
+                "   Set them in .claude/settings.json or .env file\n"
+                "   These are the same tokens used by the Slack MCP server"
+            )
+        return None
+
+    def run(self, ctx):
+        if ctx.full_reindex:
+            print(f"📅 Slack window: last {DAYS_BACK} days (FULL)")
+
+        channel_ids = get_channel_ids()
+
+        # Determine which channels to index
+        if not CHANNELS:
+            print("📡 SLACK_CHANNELS not set - indexing all accessible channels")
+            channels_to_index = sorted(channel_ids)
+            if not channels_to_index:
+                print("❌ No accessible channels found")
+                return
+            channel_source = "all accessible"
+        else:
+            channels_to_index = CHANNELS
+            channel_source = "configured"
+
+        print(f"📝 Channels ({channel_source}): {', '.join(channels_to_index)}")
+        print()
+
+        for channel_name in channels_to_index:
+            print(f"📡 Processing #{channel_name}...")
+
+            channel_id = channel_ids.get(channel_name)
+
+            if not channel_id:
+                print(f"  ❌ Channel #{channel_name} not found (check bot has access)")
+                continue
+
+            # Get last indexed timestamp for incremental updates
+            oldest_timestamp = None
+            if not ctx.full_reindex:
+                oldest_timestamp = ctx.state.get_slack_channel_timestamp(channel_name)
+
+            messages = fetch_messages(
+                channel_id,
+                channel_name,
+                oldest_timestamp=oldest_timestamp,
+                days_back=DAYS_BACK
+            )
+
+            if not messages:
+                print(f"  ℹ️  No new messages")
+                continue
+
+            latest_timestamp = index_to_chroma(ctx, messages, channel_name)
+
+            # Update state with latest timestamp
+            if latest_timestamp:
+                ctx.state.update_slack_channel(channel_name, latest_timestamp)
+
+        prune_expired(ctx)
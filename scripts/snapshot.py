@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Export/import portable snapshots of the knowledge index
+Run: source .venv/bin/activate && python scripts/snapshot.py export ~/index-snapshot.zip
+     python scripts/snapshot.py import ~/index-snapshot.zip
+
+A snapshot holds every (or the selected) collection (IDs, documents, metadata
+and embeddings) plus the indexer state and dedup data covering exactly those
+collections. Importing bulk-loads the stored embeddings without recomputing
+them and merges the state and dedup data into the local ones, so incremental
+runs continue from the snapshot's watermarks instead of re-fetching and
+re-embedding everything.
+
+Layout (zip, deflate-compressed, one file per column):
+    manifest.json
+    state.json
+    dedup.sqlite3                      (if present)
+    collections/<name>/ids.jsonl
+    collections/<name>/documents.jsonl
+    collections/<name>/metadatas.jsonl
+    collections/<name>/embeddings.npy  (float32, shape [count, dimensions])
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import zipfile
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.indexer_state import IndexerState
+from scripts.indexing_pipeline import import_chromadb, ChromaLock, IndexContext, IndexPipeline, CHROMA_PATH
+from scripts.dedup import DedupIndex, DEDUP_THRESHOLD, default_db_path
+from scripts.chroma_router import CollectionRouter, SHARD_SEPARATOR, list_collection_names, partition_for
+from scripts.embeddings import DEFAULT_EMBEDDING, metadata_identity, settings_for_identity, chroma_embedding_function
+from scripts.collection_config import live_metadata
+from scripts import slack_source, gitlab_source
+
+SNAPSHOT_FORMAT = '9yards-index-snapshot'
+# 2: state and dedup store only cover the exported collections
+SNAPSHOT_VERSION = 2
+PAGE_SIZE = 1000
+
+
+def _write_jsonl(handle, values):
+    for value in values:
+        handle.write((json.dumps(value, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+def _read_jsonl(handle):
+    for line in handle:
+        yield json.loads(line)
+
+
+def _logical_name(name):
+    """Logical collection a (shard) collection belongs to"""
+    return name.split(SHARD_SEPARATOR)[0]
+
+
+def collection_ids(collection, page_size=PAGE_SIZE):
+    """Get every document ID in a collection"""
+    ids = []
+    while True:
+        page = collection.get(include=[], limit=page_size, offset=len(ids))
+        if not page['ids']:
+            return ids
+        ids.extend(page['ids'])
+
+
+def repo_shards(client, repos):
+    """Map GitLab repos to the codebase shards that can hold their documents"""
+    router = CollectionRouter(client, gitlab_source.COLLECTION_NAME, partition=partition_for(gitlab_source.COLLECTION_NAME))
+    if router.partition == 'repo':
+        return {repo: {router.shard_name({'repo': repo})} for repo in repos}
+    # Shards by type (or the single collection) mix every repo
+    shards = set(router.shards())
+    return {repo: shards for repo in repos}
+
+
+def covered_state(client, state, names):
+    """The parts of the indexer state whose documents all live in the named collections
+
+    A watermark without all of its documents would make the importing indexer
+    skip content it never got.
+    """
+    names = set(names)
+    covered = {}
+    if slack_source.COLLECTION_NAME in names and 'slack' in state:
+        covered['slack'] = state['slack']
+
+    gitlab = state.get('gitlab', {})
+    shards = repo_shards(client, gitlab.get('repos', {}))
+    repos = {
+        repo: repo_state for repo, repo_state in gitlab.get('repos', {}).items()
+        if shards[repo] and shards[repo] <= names
+    }
+    if repos:
+        covered['gitlab'] = dict(gitlab, repos=repos)
+    return covered
+
+
+def export_collection(zf, collection, page_size=PAGE_SIZE):
+    """Stream one collection into the snapshot, a page at a time
+
+    Returns:
+        dict: Manifest entry for the collection
+    """
+    import numpy as np
+    from numpy.lib import format as npy_format
+
+    name = collection.name
+    count = collection.count()
+    prefix = f"collections/{name}"
+
+    # zipfile allows one open write handle at a time, so columns are spooled to temp files
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {column: Path(tmp) / column for column in ('ids.jsonl', 'documents.jsonl', 'metadatas.jsonl', 'embeddings.npy')}
+        handles = {column: open(path, 'wb') for column, path in paths.items()}
+
+        dimensions = None
+        written = 0
+        offset = 0
+        try:
+            while True:
+                page = collection.get(
+                    include=['documents', 'metadatas', 'embeddings'],
+                    limit=page_size,
+                    offset=offset
+                )
+                if not len(page['ids']):
+                    break
+
+                embeddings = np.asarray(page['embeddings'], dtype='<f4')
+                if dimensions is None:
+                    dimensions = embeddings.shape[1]
+                    npy_format.write_array_header_1_0(handles['embeddings.npy'], {
+                        'descr': '<f4',
+                        'fortran_order': False,
+                        'shape': (count, dimensions),
+                    })
+
+                _write_jsonl(handles['ids.jsonl'], page['ids'])
+                _write_jsonl(handles['documents.jsonl'], page['documents'])
+                _write_jsonl(handles['metadatas.jsonl'], page['metadatas'])
+                handles['embeddings.npy'].write(np.ascontiguousarray(embeddings).tobytes())
+
+                written += len(page['ids'])
+                offset += len(page['ids'])
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        if written != count:
+            raise RuntimeError(f"Collection {name} changed during export ({count} → {written} documents)")
+
+        files = {}
+        for column, path in paths.items():
+            if column == 'embeddings.npy' and dimensions is None:
+                continue
+            arcname = f"{prefix}/{column}"
+            zf.write(path, arcname)
+            files[column.split('.')[0]] = arcname
+
+    return {
+        'name': name,
+        'metadata': live_metadata(collection) or None,
+        'count': count,
+        'dimensions': dimensions,
+        'files': files,
+    }
+
+
+def export_snapshot(path, collections=None):
+    """Write all (or the selected) collections with their indexer state and dedup data to a snapshot"""
+    chromadb = import_chromadb()
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+
+    names = list_collection_names(client)
+    if collections:
+        missing = set(collections) - set(names)
+        if missing:
+            print(f"❌ Unknown collections: {', '.join(sorted(missing))}")
+            sys.exit(1)
+        names = [name for name in names if name in collections]
+
+    state = IndexerState()
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'collections': [],
+        'state': 'state.json',
+        'dedup': None,
+    }
+
+    path = Path(path).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        exported_ids = {}
+        for name in names:
+            print(f"  📦 Exporting {name}...", end='', flush=True)
+            collection = client.get_collection(name=name)
+            entry = export_collection(zf, collection)
+            manifest['collections'].append(entry)
+            exported_ids.setdefault(_logical_name(name), []).extend(collection_ids(collection))
+            print(f" {entry['count']} documents")
+
+        zf.writestr('state.json', json.dumps(covered_state(client, state.state, names), indent=2))
+
+        if default_db_path().exists():
+            with tempfile.TemporaryDirectory() as tmp:
+                dedup_path = Path(tmp) / 'dedup.sqlite3'
+                dedup = DedupIndex()
+                dedup.export_documents(dedup_path, exported_ids)
+                dedup.close()
+                zf.write(dedup_path, 'dedup.sqlite3')
+            manifest['dedup'] = 'dedup.sqlite3'
+
+        zf.writestr('manifest.json', json.dumps(manifest, indent=2))
+
+    # Never leave a half-written snapshot under the final name
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def import_collection(zf, client, entry, batch_size=PAGE_SIZE):
+    """Bulk-load one collection from the snapshot using its stored embeddings"""
+    import numpy as np
+    from numpy.lib import format as npy_format
+
+    name = entry['name']
+    if name in list_collection_names(client):
+        client.delete_collection(name=name)
+
+    # Store the model the embeddings came from, for clients that query with plain text
+    settings = settings_for_identity(metadata_identity(entry['metadata']), DEFAULT_EMBEDDING)
+    collection = client.create_collection(
+        name=name,
+        metadata=entry['metadata'] or None,
+        embedding_function=chroma_embedding_function(settings)
+    )
+    if not entry['count']:
+        return 0
+
+    files = entry['files']
+    dimensions = entry['dimensions']
+    loaded = 0
+
+    with zf.open(files['ids']) as ids_file, \
+            zf.open(files['documents']) as documents_file, \
+            zf.open(files['metadatas']) as metadatas_file, \
+            zf.open(files['embeddings']) as embeddings_file:
+        npy_format.read_magic(embeddings_file)
+        shape, _, dtype = npy_format.read_array_header_1_0(embeddings_file)
+        if shape != (entry['count'], dimensions):
+            raise RuntimeError(f"Embeddings for {name} have shape {shape}, expected {(entry['count'], dimensions)}")
+
+        ids = _read_jsonl(ids_file)
+        documents = _read_jsonl(documents_file)
+        metadatas = _read_jsonl(metadatas_file)
+        row_bytes = dimensions * dtype.itemsize
+
+        while loaded < entry['count']:
+            size = min(batch_size, entry['count'] - loaded)
+            embeddings = np.frombuffer(embeddings_file.read(size * row_bytes), dtype=dtype).reshape(size, dimensions)
+            collection.add(
+                ids=[next(ids) for _ in range(size)],
+                documents=[next(documents) for _ in range(size)],
+                metadatas=[next(metadatas) for _ in range(size)],
+                embeddings=embeddings
+            )
+            loaded += size
+
+    return loaded
+
+
+def merge_state(state, imported, replaced_repos, slack_replaced):
+    """Merge imported watermarks into the local indexer state
+
+    Local watermarks whose documents were just replaced are dropped, so the
+    next run fetches whatever the snapshot did not bring.
+    """
+    if slack_replaced:
+        state['slack'] = imported.get('slack', {'channels': {}})
+
+    repos = state.setdefault('gitlab', {'repos': {}}).setdefault('repos', {})
+    for repo in replaced_repos:
+        repos.pop(repo, None)
+    repos.update(imported.get('gitlab', {}).get('repos', {}))
+
+
+def restore_orphans(orphans):
+    """Index duplicates again whose canonical document was replaced by the import"""
+    ctx = IndexContext(IndexerState(), dedup_threshold=DEDUP_THRESHOLD)
+    restored = 0
+    try:
+        for name, documents in orphans.items():
+            source = slack_source if name == slack_source.COLLECTION_NAME else gitlab_source
+            pipeline = IndexPipeline(
+                ctx,
+                name,
+                partition=partition_for(name),
+                metadata=source.COLLECTION_METADATA,
+                dedup=True
+            )
+            restored += pipeline.restore(documents)
+    finally:
+        ctx.close()
+    return restored
+
+
+def import_snapshot(path, replace=False):
+    """Load collections from a snapshot and merge their indexer state and dedup data"""
+    chromadb = import_chromadb()
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+
+    with zipfile.ZipFile(Path(path).expanduser()) as zf:
+        manifest = json.loads(zf.read('manifest.json'))
+        if manifest.get('format') != SNAPSHOT_FORMAT:
+            raise RuntimeError("Not an index snapshot")
+        if manifest.get('version', 0) > SNAPSHOT_VERSION:
+            raise RuntimeError(
+                f"Snapshot version {manifest['version']} is newer than supported ({SNAPSHOT_VERSION}); update the scripts"
+            )
+
+        names = [entry['name'] for entry in manifest['collections']]
+        logical_names = sorted({_logical_name(name) for name in names})
+        orphans = {}
+
+        # Indexers wait until the collections, dedup data and state agree again
+        lock = ChromaLock(CHROMA_PATH)
+        lock.acquire(exclusive=True, waiting="running indexers to finish")
+        try:
+            # Refuse before loading anything, so a conflict never leaves a partial import
+            existing = set(list_collection_names(client))
+            replaced = {
+                name: collection_ids(client.get_collection(name=name))
+                for name in names if name in existing
+            }
+            conflicts = [name for name, ids in replaced.items() if ids]
+            if conflicts and not replace:
+                raise RuntimeError(
+                    f"Collections already have documents: {', '.join(conflicts)} (use --replace to overwrite)"
+                )
+
+            state = IndexerState()
+            shards = repo_shards(client, state.state.get('gitlab', {}).get('repos', {}))
+            replaced_repos = [repo for repo, shard_names in shards.items() if shard_names & set(conflicts)]
+
+            dedup = DedupIndex() if manifest.get('dedup') or default_db_path().exists() else None
+            if dedup:
+                # Replaced documents leave the dedup store; their duplicates may need indexing again
+                for name in conflicts:
+                    orphans.setdefault(_logical_name(name), []).extend(
+                        dedup.forget(_logical_name(name), replaced[name])
+                    )
+
+            imported_ids = {}
+            for entry in manifest['collections']:
+                print(f"  📦 Importing {entry['name']}...", end='', flush=True)
+                loaded = import_collection(zf, client, entry)
+                imported_ids.setdefault(_logical_name(entry['name']), []).extend(
+                    collection_ids(client.get_collection(name=entry['name']))
+                )
+                print(f" {loaded} documents")
+
+            if dedup:
+                if manifest.get('dedup'):
+                    with tempfile.TemporaryDirectory() as tmp:
+                        dedup_path = Path(tmp) / 'dedup.sqlite3'
+                        dedup_path.write_bytes(zf.read(manifest['dedup']))
+                        dedup.merge(dedup_path, imported_ids)
+                else:
+                    # Register the imported documents on the next run
+                    for name in logical_names:
+                        dedup.clear_backfilled(name)
+
+                for name in list(orphans):
+                    present = set(imported_ids.get(name, [])) | dedup.duplicate_ids(name, [o['id'] for o in orphans[name]])
+                    orphans[name] = [orphan for orphan in orphans[name] if orphan['id'] not in present]
+                dedup.close()
+
+            # Version 1 snapshots carry the full state; only take what the import covers
+            imported_state = covered_state(client, json.loads(zf.read(manifest['state'])), names)
+            merge_state(state.state, imported_state, replaced_repos, slack_source.COLLECTION_NAME in names)
+            state.save()
+        finally:
+            lock.release()
+
+    orphans = {name: documents for name, documents in orphans.items() if documents}
+    if orphans:
+        restored = restore_orphans(orphans)
+        print(f"  ♻️  Re-indexed {restored} duplicates of replaced documents")
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export/import portable knowledge index snapshots')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Write collections and indexer state to a snapshot')
+    export_parser.add_argument('path', help='Snapshot file to write (e.g. ~/index-snapshot.zip)')
+    export_parser.add_argument(
+        '--collections',
+        default='',
+        help='Comma-separated collections to export (default: all)'
+    )
+
+    import_parser = subparsers.add_parser('import', help='Load a snapshot into the local Chroma database')
+    import_parser.add_argument('path', help='Snapshot file to read')
+    import_parser.add_argument(
+        '--replace',
+        action='store_true',
+        help='Overwrite collections that already contain documents'
+    )
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"💾 Index Snapshot {args.command.capitalize()}")
+    print("=" * 60)
+    print(f"📂 Chroma path: {CHROMA_PATH}")
+    print(f"📄 Snapshot: {args.path}")
+    print()
+
+    try:
+        if args.command == 'export':
+            collections = [c.strip() for c in args.collections.split(',') if c.strip()]
+            manifest = export_snapshot(args.path, collections=collections)
+        else:
+            manifest = import_snapshot(args.path, replace=args.replace)
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+    total = sum(entry['count'] for entry in manifest['collections'])
+    print()
+    print("=" * 60)
+    print(f"✅ {len(manifest['collections'])} collections, {total} documents")
+    if args.command == 'import':
+        print("   Run scripts/index.py to continue incrementally from the snapshot")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Threaded producer/consumer pipeline with bounded queues between stages
+Lets file I/O, embedding and store writes overlap while backpressure keeps
+memory flat: a full queue blocks the stage feeding it.
+"""
+
+import os
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '64'))
+MONITOR_INTERVAL = 0.2
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+def parse_workers(spec: str, defaults: Dict[str, int]) -> Dict[str, int]:
+    """Parse per-stage worker counts like 'read=4,embed=2' on top of defaults"""
+    workers = dict(defaults)
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, count = part.partition('=')
+        name = name.strip()
+        if name not in workers or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid worker setting '{part.strip()}' (stages: {', '.join(workers)})")
+        workers[name] = int(count)
+    return workers
+
+
+class Stage:
+    """One pipeline stage
+
+    `func` is called with one input item (or a list of up to `batch_size`
+    items when batching) and returns an iterable of items for the next stage.
+    `queue_size` overrides the capacity of the stage's input queue, e.g. to
+    bound a queue of batches by the number of documents they hold.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Iterable[Any]],
+        workers: int = 1,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.busy = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+
+class StagedPipeline:
+    """Runs items through stages connected by bounded queues
+
+    Queue depths are sampled while running; a queue that stays full points at
+    the stage reading from it as the bottleneck, an empty one at the stage
+    feeding it.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = QUEUE_SIZE, on_error: Optional[Callable] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.queues = [queue.Queue(maxsize=stage.queue_size or queue_size) for stage in stages]
+        self._depths = [[] for _ in stages]
+
+    def queue_names(self) -> List[str]:
+        """Name each queue after the stages it connects"""
+        names = [f"→{self.stages[0].name}"]
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            names.append(f"{upstream.name}→{downstream.name}")
+        return names
+
+    def depths(self) -> Dict[str, int]:
+        """Current number of items waiting in each queue"""
+        return {name: q.qsize() for name, q in zip(self.queue_names(), self.queues)}
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        """Feed items through all stages and wait for them to drain
+
+        Returns:
+            dict: Per-queue depth stats (`max`, `avg`) and per-stage busy seconds
+        """
+        threads = []
+        for index, stage in enumerate(self.stages):
+            output = self.queues[index + 1] if index + 1 < len(self.stages) else None
+            stage_threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(stage, self.queues[index], output),
+                    name=f"{stage.name}-{n}",
+                    daemon=True
+                )
+                for n in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        stop_monitor = threading.Event()
+        monitor = threading.Thread(target=self._monitor, args=(stop_monitor,), daemon=True)
+        monitor.start()
+
+        try:
+            for item in items:
+                # Blocks while the first stage is saturated (backpressure on the producer)
+                self.queues[0].put(item)
+        finally:
+            # Shut down stage by stage: once every worker of a stage has exited,
+            # nothing more can reach the next queue
+            for index, stage_threads in enumerate(threads):
+                for _ in stage_threads:
+                    self.queues[index].put(_DONE)
+                for thread in stage_threads:
+                    thread.join()
+            stop_monitor.set()
+            monitor.join()
+
+        return self.report()
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: Optional[queue.Queue]):
+        batch = []
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if stage.batch_size:
+                batch.append(item)
+                if len(batch) >= stage.batch_size:
+                    self._process(stage, batch, outbox)
+                    batch = []
+            else:
+                self._process(stage, item, outbox)
+        if batch:
+            self._process(stage, batch, outbox)
+
+    def _process(self, stage: Stage, item: Any, outbox: Optional[queue.Queue]):
+        started = time.monotonic()
+        try:
+            results = list(stage.func(item) or [])
+        except Exception as e:
+            results = []
+            with stage._lock:
+                stage.errors += 1
+            if self.on_error:
+                self.on_error(stage, item, e)
+        with stage._lock:
+            stage.busy += time.monotonic() - started
+
+        if outbox is not None:
+            for result in results:
+                outbox.put(result)
+
+    def _monitor(self, stop: threading.Event):
+        while not stop.wait(MONITOR_INTERVAL):
+            for samples, q in zip(self._depths, self.queues):
+                samples.append(q.qsize())
+
+    def report(self) -> Dict[str, Any]:
+        """Queue depth and stage utilisation stats for the last run"""
+        queues = {}
+        for name, samples, q in zip(self.queue_names(), self._depths, self.queues):
+            queues[name] = {
+                'max': max(samples) if samples else 0,
+                'avg': sum(samples) / len(samples) if samples else 0.0,
+                'size': q.maxsize,
+            }
+        stages = {stage.name: {'workers': stage.workers, 'busy': stage.busy, 'errors': stage.errors} for stage in self.stages}
+        return {'queue_size': self.queue_size, 'queues': queues, 'stages': stages}